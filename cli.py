@@ -83,6 +83,21 @@ def custom_help(ctx, param, value):
     print_header("run")
     print_info("  Run the FastWindX development server.")
     print_info("  Usage: fastwindx run")
+    print_header("worker")
+    print_info("  Run a background job worker (requires JOB_BACKEND=redis).")
+    print_info("  Usage: fastwindx worker [--concurrency N]")
+    print_header("db")
+    print_info("  Manage the database schema with Alembic migrations.")
+    print_info("  Usage: fastwindx db upgrade [REVISION]")
+    print_info("  Usage: fastwindx db downgrade REVISION")
+    print_info("  Usage: fastwindx db revision -m MESSAGE [--autogenerate]")
+    print_info("  Usage: fastwindx db advise [--write]")
+    print_header("bench")
+    print_info("  Benchmark the user endpoints on one or more databases.")
+    print_info("  Usage: fastwindx bench [--database-url URL]... [--requests N] [--concurrency N]")
+    print_header("calibrate-hashing")
+    print_info("  Pick password hashing parameters for a target login latency on this host.")
+    print_info("  Usage: fastwindx calibrate-hashing [--scheme argon2|bcrypt] [--target-ms MS]")
     print_header("General Options")
     print_info("  --help  Show this message and exit.")
     ctx.exit()
@@ -225,5 +240,118 @@ def run():
         print_error("Failed to start the development server. Please check your main.py file.")
 
 
+@cli.command()
+@click.option("--concurrency", type=int, default=None, help="Maximum number of concurrent jobs.")
+def worker(concurrency):
+    """Run a FastWindX background job worker."""
+    print_logo()
+    print_info("Starting FastWindX job worker...")
+    command = ["python", "-m", "fastwindx.jobs"]
+    if concurrency:
+        command += ["--concurrency", str(concurrency)]
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError:
+        print_error("The job worker exited with an error. Please check your job settings.")
+
+
+@cli.group()
+def db():
+    """Manage the database schema."""
+    pass
+
+
+@db.command()
+@click.argument("revision", default="head")
+def upgrade(revision):
+    """Upgrade the database to a revision (default: head)."""
+    print_info(f"Upgrading database to {revision}...")
+    try:
+        subprocess.run(["alembic", "upgrade", revision], check=True)
+    except subprocess.CalledProcessError:
+        print_error("Database upgrade failed. Please check your database settings.")
+        return
+    print_success("Database upgraded.")
+
+
+@db.command()
+@click.argument("revision")
+def downgrade(revision):
+    """Downgrade the database to a revision."""
+    print_info(f"Downgrading database to {revision}...")
+    try:
+        subprocess.run(["alembic", "downgrade", revision], check=True)
+    except subprocess.CalledProcessError:
+        print_error("Database downgrade failed. Please check your database settings.")
+        return
+    print_success("Database downgraded.")
+
+
+@db.command()
+@click.option("-m", "--message", required=True, help="Short description of the migration.")
+@click.option("--autogenerate", is_flag=True, help="Detect model changes against the database.")
+def revision(message, autogenerate):
+    """Create a new migration."""
+    command = ["alembic", "revision", "-m", message]
+    if autogenerate:
+        command.append("--autogenerate")
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError:
+        print_error("Failed to create the migration.")
+        return
+    print_success("Migration created.")
+
+
+@db.command()
+@click.option("--write", is_flag=True, help="Write the proposed indexes as a migration.")
+def advise(write):
+    """Show index proposals recorded by the index advisor."""
+    command = ["python", "-m", "fastwindx.db.advisor"]
+    if write:
+        command.append("--write")
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError:
+        print_error("The index advisor failed. Is INDEX_ADVISOR_ENABLED set while running?")
+
+
+@cli.command()
+@click.option("--database-url", "database_urls", multiple=True, help="Database to benchmark.")
+@click.option("--requests", type=int, default=None, help="Requests per scenario.")
+@click.option("--concurrency", type=int, default=None, help="Concurrent requests.")
+def bench(database_urls, requests, concurrency):
+    """Benchmark the user endpoints on one or more databases."""
+    print_info("Benchmarking the user endpoints...")
+    command = ["python", "-m", "fastwindx.benchmarks"]
+    for database_url in database_urls:
+        command += ["--database-url", database_url]
+    if requests:
+        command += ["--requests", str(requests)]
+    if concurrency:
+        command += ["--concurrency", str(concurrency)]
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError:
+        print_error("The benchmark failed. Please check the database URLs.")
+
+
+@cli.command("calibrate-hashing")
+@click.option("--scheme", type=click.Choice(["argon2", "bcrypt"]), default=None, help="Scheme.")
+@click.option("--target-ms", type=float, default=None, help="Target verify latency.")
+def calibrate_hashing(scheme, target_ms):
+    """Pick password hashing parameters for a target login latency."""
+    print_info("Measuring password hashing on this host...")
+    command = ["python", "-m", "fastwindx.core.hashing"]
+    if scheme:
+        command += ["--scheme", scheme]
+    if target_ms:
+        command += ["--target-ms", str(target_ms)]
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError:
+        print_error("The calibration failed. Is argon2-cffi installed for argon2?")
+
+
 if __name__ == "__main__":
     cli()
@@ -1,14 +1,14 @@
 from typing import AsyncGenerator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
 
 from ..core.security import ALGORITHM, SECRET_KEY, oauth2_scheme
 from ..db.base import get_session
 from ..db.models.user import User
 from ..schemas.user import TokenData
+from ..services import user as user_service
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -16,7 +16,27 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> User:
+    return await _user_from_token(token, db)
+
+
+async def get_current_user_from_cookie(
+    request: Request, db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    The user of the ``access_token`` cookie set by the login view, for HTML views.
+
+    Only use this for read-only (GET) views: cookies are sent on cross-site requests too.
+    """
+    scheme, _, token = request.cookies.get("access_token", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return await _user_from_token(token, db)
+
+
+async def _user_from_token(token: str, db: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,8 +51,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
 
-    result = await db.exec(select(User).where(User.email == token_data.username))
-    user = result.first()
+    # Concurrent requests carrying the same token (e.g. parallel HTMX requests of one page)
+    # share a single lookup; each request then gets its own copy bound to its session.
+    user = await user_service.load_user_by_email(token_data.username)
     if user is None:
         raise credentials_exception
-    return user
+    return await db.merge(user, load=False)
@@ -4,11 +4,12 @@ Main router for the API v1.
 
 from fastapi import APIRouter
 
-from fastwindx.api.v1.endpoints import users
+from fastwindx.api.v1.endpoints import profiles, users
 
 api_router = APIRouter()
 
 api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
 
 # Add more routers here as you create them
 # For example:
@@ -0,0 +1,48 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ....core.profiling import profile_store
+from ....db.models.user import User
+from ...deps import get_current_user
+
+router = APIRouter()
+
+
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return current_user
+
+
+@router.get("", response_model=List[Dict[str, Any]])
+async def list_profiles(
+    limit: int = Query(100, ge=1, le=1000), current_user: User = Depends(get_admin_user)
+):
+    """
+    List stored request profiles, newest first.
+    """
+    return profile_store.list(limit)
+
+
+@router.get("/{profile_id}", response_model=Dict[str, Any])
+async def read_profile(profile_id: str, current_user: User = Depends(get_admin_user)):
+    """
+    Get a profile's summary, including the SQL statements of the request.
+    """
+    summary = profile_store.summary(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+
+@router.get("/{profile_id}/speedscope")
+async def download_profile(profile_id: str, current_user: User = Depends(get_admin_user)):
+    """
+    Download a profile as a speedscope file, to open at https://www.speedscope.app.
+    """
+    path = profile_store.speedscope_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=path.name)
@@ -1,39 +1,54 @@
+import time
 from datetime import timedelta
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from ....core.config import settings
 from ....core.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     get_password_hash,
-    verify_password,
+    verify_and_update_password,
 )
 from ....db.models.user import User
 from ....schemas.user import Token
 from ....schemas.user import User as UserSchema
-from ....schemas.user import UserCreate
+from ....schemas.user import UserBatchResult, UserCreate, UserIds
+from ....services import user as user_service
+from ....services import user_search
+from ....utils.conditional import (
+    if_match_versions,
+    not_modified,
+    precondition_failed,
+    set_cache_headers,
+)
+from ....utils.pagination import CountMode, count_rows, set_pagination_headers
 from ...deps import get_current_user, get_db
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
+
+    Side effects such as the welcome email are enqueued as background jobs.
     """
-    db_user = db.exec(select(User).where(User.email == user.email)).first()
+    db_user = (await db.exec(select(User).where(User.email == user.email))).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    db_user = db.exec(select(User).where(User.username == user.username)).first()
+    db_user = (await db.exec(select(User).where(User.username == user.username))).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -44,8 +59,10 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         phone_number=user.phone_number,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+
+    await user_service.enqueue_registration_jobs(db_user.id)
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -56,19 +73,28 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
+
+    Password hashes that don't follow the current hashing policy are upgraded.
     """
-    user = db.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = (await db.exec(select(User).where(User.email == form_data.username))).first()
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await run_in_threadpool(
+            verify_and_update_password, form_data.password, user.hashed_password
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await user_service.update_password_hash(db, user.id, user.hashed_password, new_hash)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email, "id": user.id, "role": user.role},
@@ -78,89 +104,213 @@ def login_for_access_token(
 
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(
+    request: Request, response: Response, current_user: User = Depends(get_current_user)
+):
     """
     Get current user.
+
+    Answers ``If-None-Match`` with the ETag of the user with ``304 Not Modified``.
     """
+    cached = not_modified(request, current_user.id, current_user.version, current_user.updated_at)
+    if cached:
+        return cached
+    set_cache_headers(response, current_user.id, current_user.version, current_user.updated_at)
     return current_user
 
 
 @router.put("/me", response_model=UserSchema)
 async def update_user_me(
+    request: Request,
+    response: Response,
     user_update: UserCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Update current user.
+
+    With ``If-Match``, the update only applies if the user still has that ETag and
+    fails with ``412 Precondition Failed`` otherwise, so concurrent edits aren't lost.
     """
+    versions = if_match_versions(request, current_user.id)
     if user_update.email != current_user.email:
-        if db.exec(select(User).where(User.email == user_update.email)).first():
+        if (await db.exec(select(User).where(User.email == user_update.email))).first():
             raise HTTPException(status_code=400, detail="Email already registered")
 
     if user_update.username != current_user.username:
-        if db.exec(select(User).where(User.username == user_update.username)).first():
+        if (await db.exec(select(User).where(User.username == user_update.username))).first():
             raise HTTPException(status_code=400, detail="Username already taken")
 
-    current_user.email = user_update.email
-    current_user.username = user_update.username
-    current_user.first_name = user_update.first_name
-    current_user.last_name = user_update.last_name
-    current_user.role = user_update.role
-    current_user.phone_number = user_update.phone_number
-
+    values = user_update.model_dump(
+        include={"email", "username", "first_name", "last_name", "role", "phone_number"}
+    )
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        values["hashed_password"] = await run_in_threadpool(get_password_hash, user_update.password)
 
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    user = await user_service.update_user(db, current_user.id, values, versions)
+    if user is None:
+        if versions is not None:
+            raise precondition_failed()
+        raise HTTPException(status_code=404, detail="User not found")
+    set_cache_headers(response, user.id, user.version, user.updated_at)
+    return user
 
 
 @router.get("/users", response_model=List[UserSchema])
 async def read_users(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    count: CountMode = "estimate",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Retrieve users.
+
+    The total is returned in ``X-Total-Count`` and navigation links in ``Link``. Use
+    ``count=exact`` for an exact (briefly cached) total, ``count=estimate`` for the
+    cheaper planner estimate on large tables or ``count=none`` to skip it.
     """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    users = db.exec(select(User).offset(skip).limit(limit)).all()
+    users = (await db.exec(select(User).order_by(User.id).offset(skip).limit(limit))).all()
+    total, exact = await count_rows(db, User, count)
+    set_pagination_headers(request, response, skip, limit, len(users), total, exact)
     return users
 
 
+@router.get("/search", response_model=List[UserSchema])
+async def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=user_search.MAX_QUERY_LENGTH),
+    limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_RESULTS),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Search users by username, email or name, for autocomplete.
+
+    Matches by prefix first, then fuzzily. Results of recent queries are cached for a
+    few seconds; ``Server-Timing`` shows how long the search took.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    started = time.perf_counter()
+    users, cached = await user_search.search_users(q, limit)
+    response.headers["Server-Timing"] = user_search.server_timing(started, cached)
+    return users
+
+
+def _check_batch_size(ids: List[int]) -> List[int]:
+    ids = user_service.unique_ids(ids)
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.BATCH_MAX_IDS} ids per request"
+        )
+    return ids
+
+
+@router.get("/users/batch", response_model=List[UserBatchResult])
+async def read_users_batch(
+    ids: List[int] = Query(..., min_length=1),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get several users by id in a single query.
+    """
+    ids = _check_batch_size(ids)
+    is_admin = current_user.role == "admin"
+    users = await user_service.get_users_by_ids(db, ids)
+    results = []
+    for user_id in ids:
+        user = users.get(user_id)
+        if user is None:
+            results.append(UserBatchResult(id=user_id, status="not_found"))
+        elif user.id != current_user.id and not is_admin:
+            results.append(UserBatchResult(id=user_id, status="forbidden"))
+        else:
+            results.append(UserBatchResult(id=user_id, status="ok", user=user))
+    return results
+
+
+@router.post("/users/batch/deactivate", response_model=List[UserBatchResult])
+async def deactivate_users_batch(
+    user_ids: UserIds,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Deactivate several users in a single statement.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    ids = _check_batch_size(user_ids.ids)
+    found = await user_service.deactivate_users(db, ids)
+    return [
+        UserBatchResult(id=user_id, status="ok" if user_id in found else "not_found")
+        for user_id in ids
+    ]
+
+
+@router.post("/users/batch/delete", response_model=List[UserBatchResult])
+async def delete_users_batch(
+    user_ids: UserIds,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Delete several users in a single statement.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    ids = _check_batch_size(user_ids.ids)
+    found = await user_service.delete_users(db, ids)
+    return [
+        UserBatchResult(id=user_id, status="ok" if user_id in found else "not_found")
+        for user_id in ids
+    ]
+
+
 @router.get("/users/{user_id}", response_model=UserSchema)
 async def read_user(
-    user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    user_id: int,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
 ):
     """
     Get a specific user by id.
+
+    Concurrent reads of the same user share one query. Answers ``If-None-Match`` with
+    the ETag of the user with ``304 Not Modified``.
     """
-    user = db.get(User, user_id)
+    user = await user_service.load_user(user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     if user.id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
+    cached = not_modified(request, user.id, user.version, user.updated_at)
+    if cached:
+        return cached
+    set_cache_headers(response, user.id, user.version, user.updated_at)
     return user
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-    user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    user_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a user.
     """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
     return {"ok": True}
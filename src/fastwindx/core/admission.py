@@ -0,0 +1,178 @@
+"""
+Adaptive load shedding.
+
+``LoadMonitor`` tracks the signals that show a worker is saturated: requests in flight,
+time spent waiting for a database connection and event-loop lag.
+``AdmissionControlMiddleware`` answers new requests with a fast ``503`` and a
+``Retry-After`` header while any of them is past its configured threshold, instead of
+letting them queue up behind the requests already being served.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import Dict, Optional, Sequence
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# While overloaded, shed requests are summarized in one warning per interval.
+SHED_LOG_INTERVAL_SECONDS = 10.0
+
+
+class DecayingAverage:
+    """
+    Exponentially weighted average that also decays towards zero over time.
+
+    Time decay matters for load shedding: without it, a spike recorded just before
+    requests start being rejected would never be replaced by newer (lower) samples.
+    """
+
+    def __init__(self, half_life: float = 5.0):
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * math.pow(0.5, (now - self._updated) / self.half_life)
+
+    def add(self, sample: float):
+        now = time.monotonic()
+        self._value = 0.8 * self._decayed(now) + 0.2 * sample
+        self._updated = now
+
+    @property
+    def value(self) -> float:
+        return self._decayed(time.monotonic())
+
+
+class LoadMonitor:
+    """
+    Process-wide load signals used for admission control and readiness.
+    """
+
+    def __init__(self, lag_interval: float = 0.5):
+        self.in_flight = 0
+        self.rejected = 0
+        self.pool_wait = DecayingAverage()
+        self.loop_lag = DecayingAverage()
+        self.lag_interval = lag_interval
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def record_pool_wait(self, seconds: float):
+        self.pool_wait.add(seconds * 1000)
+
+    def start(self):
+        """Start measuring event-loop lag on the running loop."""
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._measure_loop_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    async def _measure_loop_lag(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = time.perf_counter() - started - self.lag_interval
+            self.loop_lag.add(max(0.0, lag) * 1000)
+
+    def overload_reason(self) -> Optional[str]:
+        """Return why the worker should shed load, or ``None`` if it can take more."""
+        if self.in_flight >= settings.ADMISSION_MAX_IN_FLIGHT:
+            return "too many requests in flight"
+        if self.pool_wait.value >= settings.ADMISSION_MAX_POOL_WAIT_MS:
+            return "database pool saturated"
+        if self.loop_lag.value >= settings.ADMISSION_MAX_LOOP_LAG_MS:
+            return "event loop lagging"
+        return None
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "pool_wait_ms": round(self.pool_wait.value, 2),
+            "loop_lag_ms": round(self.loop_lag.value, 2),
+        }
+
+
+load_monitor = LoadMonitor()
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware rejecting requests with ``503 Retry-After`` while overloaded.
+
+    Paths starting with one of ``exempt_paths`` (health probes, static files) are
+    always served and don't count towards the in-flight requests.
+    """
+
+    def __init__(
+        self,
+        app,
+        monitor: LoadMonitor = load_monitor,
+        exempt_paths: Sequence[str] = ("/health", "/static"),
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.exempt_paths = tuple(exempt_paths)
+        self._shed_since_warning = 0
+        self._last_warning = -math.inf
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        reason = self.monitor.overload_reason()
+        if reason is not None:
+            self.monitor.rejected += 1
+            self._log_shed(scope["path"], reason)
+            await self._reject(send, reason)
+            return
+
+        self.monitor.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight -= 1
+
+    def _log_shed(self, path: str, reason: str):
+        # One warning per request would turn an overload into a log storm.
+        self._shed_since_warning += 1
+        now = time.monotonic()
+        if now - self._last_warning < SHED_LOG_INTERVAL_SECONDS:
+            logger.debug("Shedding request to %s: %s.", path, reason)
+            return
+        logger.warning(
+            "Shedding load (%s): %d requests rejected since the last warning, latest to %s.",
+            reason,
+            self._shed_since_warning,
+            path,
+        )
+        self._shed_since_warning = 0
+        self._last_warning = now
+
+    async def _reject(self, send, reason: str):
+        body = json.dumps({"detail": "Service overloaded, retry later", "reason": reason})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body.encode()})
@@ -25,13 +25,48 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost", "http://localhost:8080"]
+    BATCH_MAX_IDS: int = 500  # Maximum number of ids accepted by the batch user endpoints
+
+    # Password hashing settings (calibrate with "fastwindx calibrate-hashing")
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "argon2" or "bcrypt"; other hashes upgrade on login
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST_KB: int = 64 * 1024
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_TARGET_MS: float = 250.0  # Verify latency the calibration aims for
+
+    # Pagination settings
+    PAGINATION_COUNT_CACHE_TTL_SECONDS: float = 30.0  # How long exact totals are reused
+    PAGINATION_ESTIMATE_MIN_ROWS: int = 10_000  # Below this, estimates fall back to count(*)
+    PAGINATION_MAX_LIMIT: int = 1000  # Largest page a client can request
+
+    # User search settings
+    SEARCH_MAX_RESULTS: int = 20
+    SEARCH_CACHE_SIZE: int = 256  # Number of recent queries whose results are kept
+    SEARCH_CACHE_TTL_SECONDS: float = 5.0
+    SEARCH_INDEX_TTL_SECONDS: float = 60.0  # Rebuild interval of the in-process (SQLite) index
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.3  # Fuzzy match cut-off of the in-process index
+    SEARCH_LATENCY_BUDGET_MS: float = 5.0  # Slower searches are logged
 
     # Database settings
+    DATABASE_BACKEND: str = "postgresql"  # "postgresql" or "sqlite" (single-node installs)
     POSTGRES_SERVER: str = "db"
     POSTGRES_USER: str = "fastwindx"
     POSTGRES_PASSWORD: str = "fastwindx"
     POSTGRES_DB: str = "fastwindx"
+    SQLITE_PATH: Path = Path("fastwindx.db")
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # Bytes of the database file to memory-map
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # Page cache per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # How long to wait for a lock held by another process
+    SQLITE_SINGLE_WRITER: bool = True  # Serialize writes through one connection
+    SQLITE_WRITE_TIMEOUT_SECONDS: float = 30.0  # Max wait for the writer connection
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    DB_AUTO_MIGRATE: bool = False  # Migrate on startup (single-process deployments only)
+
+    # Index advisor (development only): records query patterns and proposes indexes
+    INDEX_ADVISOR_ENABLED: bool = False
+    INDEX_ADVISOR_SLOW_QUERY_MS: float = 50.0
+    INDEX_ADVISOR_REPORT_PATH: Path = Path("index_advisor.json")
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     @classmethod
@@ -41,31 +76,62 @@ class Settings(BaseSettings):
         """
         if isinstance(v, str):
             return v
-        print(f"Assembling DB connection with data: {info.data}")
+        if info.data.get("DATABASE_BACKEND") == "sqlite":
+            url = f"sqlite+aiosqlite:///{info.data.get('SQLITE_PATH')}"
+            logger.debug("Using the SQLite database %s.", info.data.get("SQLITE_PATH"))
+            return url
         url = AnyUrl.build(
             scheme="postgresql+asyncpg",
             username=info.data.get("POSTGRES_USER"),
             password=info.data.get("POSTGRES_PASSWORD"),
             host=info.data.get("POSTGRES_SERVER"),
-            path=f"/{info.data.get('POSTGRES_DB') or ''}",
+            path=info.data.get("POSTGRES_DB") or "",
         ).unicode_string()
-        logger.info(f"***********DATABASE URL: {url}")
+        logger.debug("Assembled database URL for host %s.", info.data.get("POSTGRES_SERVER"))
         return url
 
     # Redis settings
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    # Background job settings
+    JOB_BACKEND: str = "memory"  # "memory" (in-process) or "redis" (durable)
+    JOB_IN_PROCESS_WORKER: bool = False  # Also run a worker inside the web app for "redis"
+    JOB_CONCURRENCY: int = 10
+    JOB_MAX_RETRIES: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 2.0
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    JOB_REDIS_PREFIX: str = "fastwindx:jobs"
+
+    # Health checks and admission control
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 200
+    ADMISSION_MAX_POOL_WAIT_MS: float = 250.0
+    ADMISSION_MAX_LOOP_LAG_MS: float = 200.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    # Request profiling settings
+    PROFILING_ENABLED: bool = False  # Profile requests sent by admins with "X-Profile: 1"
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of all requests profiled automatically
+    PROFILING_INTERVAL_MS: float = 1.0  # Time between stack samples
+    PROFILING_DIR: Path = Path("profiles")
+    PROFILING_MAX_PROFILES: int = 200  # Older profiles are deleted
+
+    # Logging settings
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SQL: bool = False  # Log SQL statements, subject to the sampling and rate limits below
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped instead of blocking
+    LOG_SAMPLING: Dict[str, float] = {"sqlalchemy.engine": 0.1}  # Logger prefix -> kept fraction
+    LOG_RATE_LIMITS: Dict[str, float] = {"sqlalchemy.engine": 50.0}  # Logger prefix -> records/s
+
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
     # Templates
     TEMPLATES_DIR: Path = Path(__file__).parent.parent / "templates"
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        print(f"Loaded settings: {self.model_dump()}")
-
 
 settings = Settings()
-
-print(settings.model_dump())
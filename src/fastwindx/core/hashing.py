@@ -0,0 +1,161 @@
+"""
+Password hashing policy.
+
+The scheme and its cost parameters come from the ``PASSWORD_*`` settings. Hashes made
+with another scheme or other parameters still verify, and are replaced with a hash
+under the current policy the next time the user logs in (see
+``security.verify_and_update_password``), so the policy can be changed at any time.
+
+The cost that gives a reasonable login latency depends on the host. Calibrate it with
+``fastwindx calibrate-hashing`` (``python -m fastwindx.core.hashing``), which measures
+verify times on this machine and prints the settings that hit a target latency.
+"""
+
+import statistics
+import time
+from typing import Dict, Tuple
+
+import click
+from passlib.context import CryptContext
+
+SCHEMES = ("argon2", "bcrypt")
+
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+ARGON2_MIN_MEMORY_COST_KB = 8 * 1024
+ARGON2_MAX_TIME_COST = 50
+
+
+def create_password_context(settings) -> CryptContext:
+    """
+    Build the passlib context for the configured hashing policy.
+
+    The configured scheme hashes new passwords; the other one is only accepted for
+    verification and marked deprecated, so its hashes are upgraded on login.
+    """
+    if settings.PASSWORD_HASH_SCHEME not in SCHEMES:
+        raise ValueError(
+            f"PASSWORD_HASH_SCHEME must be one of {', '.join(SCHEMES)}, "
+            f"not {settings.PASSWORD_HASH_SCHEME!r}"
+        )
+    schemes = [settings.PASSWORD_HASH_SCHEME]
+    schemes += [scheme for scheme in SCHEMES if scheme != settings.PASSWORD_HASH_SCHEME]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+        argon2__time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST_KB,
+        argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    )
+
+
+def measure_verify_ms(context: CryptContext, repeat: int = 3) -> float:
+    """Median time in milliseconds to verify a password with ``context``."""
+    hashed = context.hash("calibration password")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify("calibration password", hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, repeat: int = 3) -> Tuple[Dict[str, int], float]:
+    """
+    The highest bcrypt rounds whose verify time stays within ``target_ms``.
+
+    Every extra round doubles the cost, so the search stops at the first round over the
+    target. Returns the settings and their measured verify time.
+    """
+    rounds = BCRYPT_MIN_ROUNDS
+    elapsed = measure_verify_ms(CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds), repeat)
+    while rounds < BCRYPT_MAX_ROUNDS:
+        # Don't measure a round predicted to be well over the target: it may take long.
+        if elapsed * 2 > target_ms * 1.5:
+            break
+        next_elapsed = measure_verify_ms(
+            CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds + 1), repeat
+        )
+        if next_elapsed > target_ms:
+            break
+        rounds, elapsed = rounds + 1, next_elapsed
+    return {"PASSWORD_BCRYPT_ROUNDS": rounds}, elapsed
+
+
+def calibrate_argon2(
+    target_ms: float, memory_cost_kb: int, parallelism: int, repeat: int = 3
+) -> Tuple[Dict[str, int], float]:
+    """
+    Argon2 parameters whose verify time is as close as possible to ``target_ms``
+    without exceeding it.
+
+    Memory is the main defence against GPU cracking, so ``memory_cost_kb`` is kept and
+    the time cost raised; memory is only halved when a single pass is already too slow.
+    """
+
+    def measure(time_cost: int, memory_cost: int) -> float:
+        context = CryptContext(
+            schemes=["argon2"],
+            argon2__time_cost=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism,
+        )
+        return measure_verify_ms(context, repeat)
+
+    memory_cost = memory_cost_kb
+    elapsed = measure(1, memory_cost)
+    while elapsed > target_ms and memory_cost // 2 >= ARGON2_MIN_MEMORY_COST_KB:
+        memory_cost //= 2
+        elapsed = measure(1, memory_cost)
+
+    # Time is roughly linear in the time cost: estimate, then adjust by measuring.
+    time_cost = max(1, min(ARGON2_MAX_TIME_COST, int(target_ms // max(elapsed, 0.01))))
+    if time_cost > 1:
+        elapsed = measure(time_cost, memory_cost)
+        while time_cost > 1 and elapsed > target_ms:
+            time_cost -= 1
+            elapsed = measure(time_cost, memory_cost)
+    return (
+        {
+            "PASSWORD_ARGON2_TIME_COST": time_cost,
+            "PASSWORD_ARGON2_MEMORY_COST_KB": memory_cost,
+            "PASSWORD_ARGON2_PARALLELISM": parallelism,
+        },
+        elapsed,
+    )
+
+
+@click.command()
+@click.option("--scheme", type=click.Choice(SCHEMES), default=None, help="Default: configured.")
+@click.option("--target-ms", type=float, default=None, help="Target verify latency.")
+@click.option("--repeat", default=3, show_default=True, help="Measurements per setting.")
+def main(scheme, target_ms, repeat):
+    """Pick password hashing parameters for a target verify latency on this host."""
+    from .config import settings
+
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    target_ms = target_ms or settings.PASSWORD_HASH_TARGET_MS
+    click.echo(f"Calibrating {scheme} for a verify time of about {target_ms:.0f}ms...", err=True)
+    if scheme == "bcrypt":
+        parameters, elapsed = calibrate_bcrypt(target_ms, repeat)
+    else:
+        parameters, elapsed = calibrate_argon2(
+            target_ms,
+            settings.PASSWORD_ARGON2_MEMORY_COST_KB,
+            settings.PASSWORD_ARGON2_PARALLELISM,
+            repeat,
+        )
+    click.echo(f"Measured verify time: {elapsed:.1f}ms. Add to your .env:", err=True)
+    click.echo(f"PASSWORD_HASH_SCHEME={scheme}")
+    for name, value in parameters.items():
+        click.echo(f"{name}={value}")
+    if elapsed > target_ms:
+        click.echo(
+            "Even the cheapest allowed parameters are slower than the target on this host.",
+            err=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
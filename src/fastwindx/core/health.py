@@ -0,0 +1,126 @@
+"""
+Dependency health checks for the readiness probe.
+
+Checks run in the background on a fixed interval and their last result is cached, so
+the probe endpoint itself never touches the database or Redis and costs nothing no
+matter how often the load balancer calls it.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyProbe:
+    """
+    A periodically refreshed check of one dependency.
+    """
+
+    def __init__(self, name: str, check: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.check = check
+        self.ok = False
+        self.error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    async def run(self, timeout: float):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.check(), timeout)
+        except Exception as e:
+            if self.ok or self.checked_at is None:
+                logger.warning("Health check %s failed: %r", self.name, e)
+            self.ok, self.error = False, repr(e)
+        else:
+            if not self.ok and self.checked_at is not None:
+                logger.info("Health check %s recovered.", self.name)
+            self.ok, self.error = True, None
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.checked_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "error": self.error,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+        }
+
+
+class HealthMonitor:
+    """
+    Runs dependency probes in the background and caches their results.
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.probes: List[DependencyProbe] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, check: Callable[[], Awaitable[Any]]):
+        self.probes.append(DependencyProbe(name, check))
+
+    @property
+    def healthy(self) -> bool:
+        return all(probe.ok for probe in self.probes)
+
+    async def refresh(self):
+        await asyncio.gather(*(probe.run(self.timeout) for probe in self.probes))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {probe.name: probe.to_dict() for probe in self.probes}
+
+
+async def check_database():
+    from ..db.base import async_engine
+
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+def create_health_monitor() -> HealthMonitor:
+    """
+    Build the health monitor for the dependencies this app is configured to use.
+    """
+    monitor = HealthMonitor(
+        interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+        timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    )
+    monitor.add("database", check_database)
+
+    if settings.JOB_BACKEND == "redis":
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        monitor.add("redis", client.ping)
+    return monitor
+
+
+health_monitor = create_health_monitor()
@@ -0,0 +1,283 @@
+"""
+Logging pipeline for FastWindX.
+
+Records are filtered (sampling, rate limits) and tagged with the current request id on
+the calling thread, then handed to a bounded queue. A background listener thread does
+the formatting and the actual I/O, so logging never blocks the event loop.
+"""
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``.
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class _PrefixRules:
+    """
+    Resolve a logger name to the most specific configured prefix, with caching.
+    """
+
+    def __init__(self, rules: Dict[str, float]):
+        self.rules = rules
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def match(self, name: str) -> Optional[str]:
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        matched = None
+        for prefix in self.rules:
+            if name == prefix or name.startswith(prefix + "."):
+                if matched is None or len(prefix) > len(matched):
+                    matched = prefix
+        self._cache[name] = matched
+        return matched
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Attach the id of the request being handled (if any) to every record.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records of the configured loggers.
+
+    ``rates`` maps logger name prefixes to the fraction (0.0-1.0) of records to keep.
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self._rules = _PrefixRules(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._rules.match(record.name)
+        if prefix is None:
+            return True
+        return random.random() < self._rules.rules[prefix]
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket rate limit per logger prefix.
+
+    ``limits`` maps logger name prefixes to the maximum number of records per second.
+    The number of records dropped is reported on the next record that gets through.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        self._rules = _PrefixRules(limits)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._rules.match(record.name)
+        if prefix is None:
+            return True
+
+        rate = self._rules.rules[prefix]
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, dropped = self._buckets.get(prefix, (rate, now, 0))
+            tokens = min(rate, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[prefix] = (tokens, now, dropped + 1)
+                return False
+            self._buckets[prefix] = (tokens - 1, now, 0)
+        if dropped:
+            record.dropped = dropped
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON objects.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records instead of blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what depends on the calling thread; formatting happens on the
+        # listener thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[QueueListener] = None
+# Logging configuration replaced by ``setup_logging``, put back by ``shutdown_logging``.
+_previous_config: Optional[Tuple[list, int, Dict[str, Tuple[list, bool]]]] = None
+
+
+def setup_logging(settings) -> QueueListener:
+    """
+    Route all logging through a background writer thread, configured from settings.
+
+    Pair every call with ``shutdown_logging``, which stops the thread and restores the
+    previous handlers; records would otherwise pile up in a queue nobody drains.
+    """
+    global _listener, _previous_config
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler()
+    if settings.LOG_JSON:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+        )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLING))
+    queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMITS))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    _previous_config = (
+        root.handlers,
+        root.level,
+        {
+            name: (logging.getLogger(name).handlers, logging.getLogger(name).propagate)
+            for name in _SERVER_LOGGERS
+        },
+    )
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    # Let server and SQL logs flow through the same pipeline.
+    for name in _SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        server_logger.handlers = []
+        server_logger.propagate = True
+    logging.getLogger("sqlalchemy.engine").setLevel(
+        logging.INFO if settings.LOG_SQL else logging.WARNING
+    )
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """
+    Flush queued records, stop the writer thread and restore the previous handlers.
+    """
+    global _listener, _previous_config
+    if _listener is None:
+        return
+    if _previous_config is not None:
+        root_handlers, root_level, server_loggers = _previous_config
+        root = logging.getLogger()
+        root.handlers = root_handlers
+        root.setLevel(root_level)
+        for name, (handlers, propagate) in server_loggers.items():
+            logging.getLogger(name).handlers = handlers
+            logging.getLogger(name).propagate = propagate
+        _previous_config = None
+    _listener.stop()
+    _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that assigns every request an id for log correlation.
+
+    An incoming ``X-Request-ID`` header is reused, otherwise a new id is generated. The
+    id is echoed back in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,385 @@
+"""
+On-demand request profiling.
+
+``ProfilingMiddleware`` profiles a request when an admin sends the ``X-Profile`` header
+or when it is picked by ``PROFILING_SAMPLE_RATE``. A sampling profiler then records the
+request's stack every ``PROFILING_INTERVAL_MS``: the running stack while the request's
+task is on the event loop, and the chain of awaiting coroutines while it waits, so the
+profile shows where wall-clock time went, not only CPU time. SQL statements issued
+during the request are recorded with their timings and show up in the samples taken
+while they run.
+
+Profiles are written as speedscope files (https://www.speedscope.app) to
+``PROFILING_DIR``, with a small JSON summary next to each, and listed by the admin
+endpoints in ``api.v1.endpoints.profiles``. Requests that aren't profiled only pay for
+a header scan and a random number.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+from sqlalchemy import event
+
+from .config import settings
+from .logs import request_id_var
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-z_-]{1,80}$")
+SPEEDSCOPE_SUFFIX = ".speedscope.json"
+SUMMARY_SUFFIX = ".summary.json"
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+Frame = Tuple[str, str, int]
+
+
+class RequestProfile:
+    """
+    The samples and SQL statements recorded for one request.
+    """
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.request_id = request_id_var.get()
+        self.interval = interval
+        self.status: Optional[int] = None
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        # Each sample is a stack of frame indexes (root first) and its weight in ms.
+        self.frames: List[Frame] = []
+        self.frame_index: Dict[Frame, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        # (statement, start ms, duration ms)
+        self.statements: List[Tuple[str, float, float]] = []
+        self.current_statement: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def start(self):
+        self._task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration_ms = self.elapsed_ms()
+
+    def _frame(self, key: Frame) -> int:
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            stack = self._stack()
+            if stack:
+                self.samples.append([self._frame(frame) for frame in stack])
+                self.weights.append((now - last) * 1000)
+            last = now
+
+    def _stack(self) -> List[Frame]:
+        """The request's current stack, root first."""
+        coro = self._task.get_coro() if self._task is not None else None
+        if coro is None:
+            return []
+        if asyncio.current_task(self._loop) is self._task:
+            frame = sys._current_frames().get(self._thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            # Drop the event loop's own frames below the request's coroutine.
+            root = getattr(coro, "cr_frame", None)
+            if root in frames:
+                frames = frames[frames.index(root) :]
+            return [_frame_key(frame) for frame in frames]
+
+        stack = []
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is not None:
+                stack.append(_frame_key(frame))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        statement = self.current_statement
+        stack.append((f"SQL: {statement}" if statement else "(waiting)", "", 0))
+        return stack
+
+    def record_statement(self, statement: str, started_ms: float, duration_ms: float):
+        self.statements.append((statement, started_ms, duration_ms))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "request_id": self.request_id,
+            "created_at": time.time(),
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": len(self.samples),
+            "sql_count": len(self.statements),
+            "sql_ms": round(sum(duration for _, _, duration in self.statements), 2),
+            "sql": [
+                {
+                    "statement": statement,
+                    "start_ms": round(start, 2),
+                    "duration_ms": round(duration, 2),
+                }
+                for statement, start, duration in self.statements
+            ],
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        The profile in speedscope's file format: the stack samples, plus the SQL
+        statements as an evented profile on the same timeline.
+        """
+        sql_events = []
+        end = 0.0
+        for statement, start, duration in sorted(self.statements, key=lambda s: s[1]):
+            # Evented profiles must nest; clip statements overlapping the previous one.
+            start = max(start, end)
+            end = max(start, start + duration)
+            index = self._frame((f"SQL: {statement}", "", 0))
+            sql_events.append({"type": "O", "frame": index, "at": start})
+            sql_events.append({"type": "C", "frame": index, "at": end})
+
+        name = f"{self.method} {self.path}"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "fastwindx",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    (
+                        {"name": frame_name, "file": file, "line": line}
+                        if file
+                        else {"name": frame_name}
+                    )
+                    for frame_name, file, line in self.frames
+                ]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": self.duration_ms,
+                    "samples": self.samples,
+                    "weights": self.weights,
+                },
+                {
+                    "type": "evented",
+                    "name": f"{name} (SQL)",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": max(self.duration_ms, end),
+                    "events": sql_events,
+                },
+            ],
+        }
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    # co_qualname is new in Python 3.11.
+    return (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+
+
+class ProfileStore:
+    """
+    Profiles on disk: ``<id>.speedscope.json`` files with a ``<id>.summary.json`` each.
+    """
+
+    def __init__(self, directory: Path, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, profile: RequestProfile):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile.id}{SPEEDSCOPE_SUFFIX}").write_text(
+            json.dumps(profile.to_speedscope())
+        )
+        (self.directory / f"{profile.id}{SUMMARY_SUFFIX}").write_text(json.dumps(profile.summary()))
+        self._prune()
+
+    def _prune(self):
+        summaries = sorted(self.directory.glob(f"*{SUMMARY_SUFFIX}"))
+        for summary in summaries[: max(0, len(summaries) - self.max_profiles)]:
+            profile_id = summary.name[: -len(SUMMARY_SUFFIX)]
+            summary.unlink(missing_ok=True)
+            (self.directory / f"{profile_id}{SPEEDSCOPE_SUFFIX}").unlink(missing_ok=True)
+
+    def list(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first (without their SQL)."""
+        if not self.directory.exists():
+            return []
+        found = []
+        for path in sorted(self.directory.glob(f"*{SUMMARY_SUFFIX}"), reverse=True)[:limit]:
+            try:
+                summary = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            summary.pop("sql", None)
+            found.append(summary)
+        return found
+
+    def _path(self, profile_id: str, suffix: str) -> Optional[Path]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.exists() else None
+
+    def speedscope_path(self, profile_id: str) -> Optional[Path]:
+        return self._path(profile_id, SPEEDSCOPE_SUFFIX)
+
+    def summary(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(profile_id, SUMMARY_SUFFIX)
+        return json.loads(path.read_text()) if path is not None else None
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is not None:
+        statement = " ".join(statement.split())[:500]
+        profile.current_statement = statement
+        conn.info.setdefault("profile_query_start", []).append((statement, profile.elapsed_ms()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is not None and conn.info.get("profile_query_start"):
+        statement, started = conn.info["profile_query_start"].pop()
+        profile.current_statement = None
+        profile.record_statement(statement, started, profile.elapsed_ms() - started)
+
+
+def install_sql_hooks(engine):
+    """Record the SQL of profiled requests on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def _is_admin(headers) -> bool:
+    """
+    Whether the bearer token belongs to an admin. The role is read from the database,
+    not from the token, which outlives role changes.
+    """
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            from ..services import user as user_service
+            from .security import ALGORITHM, SECRET_KEY
+
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                return False
+            if payload.get("sub") is None:
+                return False
+            user = await user_service.load_user_by_email(payload["sub"])
+            return user is not None and user.role == "admin"
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests on demand.
+
+    A request is profiled when it carries ``X-Profile: 1`` with an admin's bearer token,
+    or at random with probability ``sample_rate``. The profile's id is returned in the
+    ``X-Profile-Id`` response header.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore = profile_store,
+        sample_rate: Optional[float] = None,
+        interval_ms: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.interval = (interval_ms or settings.PROFILING_INTERVAL_MS) / 1000
+
+    async def _should_profile(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value not in (b"", b"0") and await _is_admin(scope["headers"])
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], self.interval)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile.id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            _active_profile.reset(token)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.store.save, profile)
+            except OSError as e:
+                logger.warning("Could not save profile %s: %r", profile.id, e)
+            else:
+                logger.info(
+                    "Profiled %s %s in %.1fms (%d SQL statements): %s",
+                    profile.method,
+                    profile.path,
+                    profile.duration_ms,
+                    len(profile.statements),
+                    profile.id,
+                )
@@ -0,0 +1,412 @@
+"""
+Development-time index advisor.
+
+The advisor listens to the statements an engine sends to the database, groups them into
+query patterns and records which columns they filter on. Predicates that no existing
+index can serve are turned into index proposals (including partial indexes for boolean
+flags such as ``is_active`` and expression indexes for ``lower(email)`` style lookups),
+which ``fastwindx db advise --write`` turns into an Alembic migration.
+
+Enable it with ``INDEX_ADVISOR_ENABLED=true``; it is not meant for production traffic.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import click
+from sqlalchemy import Boolean, MetaData, event, inspect
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Expanded IN lists and ANY arrays vary in length; collapse them so they share a pattern.
+_PARAM_LIST_RE = re.compile(r"\(\s*(?:\$\d+|\?|%\(\w+\)s)(?:\s*,\s*(?:\$\d+|\?|%\(\w+\)s))*\s*\)")
+_WHERE_RE = re.compile(
+    r"\bWHERE\b(?P<where>.*?)(?=\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|\bOFFSET\b|\bRETURNING\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_PREDICATE_RE = re.compile(
+    r"(?:(?P<func>lower|upper)\s*\(\s*)?\"?(?P<table>\w+)\"?\.\"?(?P<column>\w+)\"?\s*\)?\s*"
+    r"(?P<op>=\s*ANY|NOT\s+IN|IN|NOT\s+I?LIKE|I?LIKE|IS\s+NOT|IS|<>|!=|>=|<=|=|>|<)"
+    # Boolean literals (SQLite renders them as 1/0); other values are bound parameters.
+    r"(?:\s*(?P<value>true|false|1|0)\b)?",
+    re.IGNORECASE,
+)
+
+EQUALITY_OPS = {"=", "=ANY", "IN", "IS"}
+RANGE_OPS = {">", "<", ">=", "<=", "LIKE", "ILIKE"}
+NEGATING_OPS = {"<>", "!=", "IS NOT"}
+
+
+@dataclass
+class Predicate:
+    table: str
+    column: str
+    op: str
+    func: Optional[str] = None
+    value: Optional[str] = None
+
+    @property
+    def expression(self) -> str:
+        return f"{self.func}({self.column})" if self.func else self.column
+
+    @property
+    def flag_condition(self) -> Optional[str]:
+        """
+        The partial index condition for a boolean column compared with a literal, e.g.
+        ``is_active`` or ``NOT is_active``; ``None`` for bound parameters.
+        """
+        if self.value is None or (self.op not in ("=", "IS") and self.op not in NEGATING_OPS):
+            return None
+        is_true = self.value.lower() in ("true", "1")
+        if self.op in NEGATING_OPS:
+            is_true = not is_true
+        return self.column if is_true else f"NOT {self.column}"
+
+
+@dataclass
+class QueryPattern:
+    """
+    Aggregated statistics for one normalized statement.
+    """
+
+    statement: str
+    predicates: List[Predicate] = field(default_factory=list)
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    slow_count: int = 0
+
+
+@dataclass
+class IndexProposal:
+    """
+    An index the advisor thinks would serve observed query patterns.
+    """
+
+    table: str
+    expressions: List[str]
+    where: Optional[str] = None
+    reason: str = ""
+    count: int = 0
+    total_ms: float = 0.0
+
+    @property
+    def name(self) -> str:
+        parts = [re.sub(r"\W+", "_", e).strip("_") for e in self.expressions]
+        if self.where:
+            parts.append(re.sub(r"\W+", "_", self.where).lower())
+        return f"ix_{self.table}_{'_'.join(parts)}"[:63]
+
+    @property
+    def sql(self) -> str:
+        columns = ", ".join(self.expressions)
+        statement = f'CREATE INDEX {self.name} ON "{self.table}" ({columns})'
+        if self.where:
+            statement += f" WHERE {self.where}"
+        return statement
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    return _PARAM_LIST_RE.sub("(...)", statement)
+
+
+def parse_predicates(statement: str) -> List[Predicate]:
+    """
+    Extract the ``table.column <op>`` predicates from the WHERE clause of a statement.
+    """
+    match = _WHERE_RE.search(statement)
+    if match is None:
+        return []
+    predicates = []
+    for found in _PREDICATE_RE.finditer(match.group("where")):
+        op = _WHITESPACE_RE.sub(" ", found.group("op").upper())
+        if op == "= ANY":
+            op = "=ANY"
+        predicates.append(
+            Predicate(
+                table=found.group("table"),
+                column=found.group("column"),
+                op=op,
+                func=found.group("func").lower() if found.group("func") else None,
+                value=found.group("value"),
+            )
+        )
+    return predicates
+
+
+class IndexAdvisor:
+    """
+    Records query patterns observed on an engine and proposes missing indexes.
+    """
+
+    def __init__(self, metadata: MetaData, slow_query_ms: float = 50.0):
+        self.metadata = metadata
+        self.slow_query_ms = slow_query_ms
+        self.patterns: Dict[str, QueryPattern] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine):
+        """Start listening on a (sync) engine, e.g. ``async_engine.sync_engine``."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self, engine: Engine):
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # The start time lives on the execution context, which is discarded with the
+    # statement, so failing statements (no after_cursor_execute) leave nothing behind.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.advisor_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "advisor_query_start", None)
+        if started is not None:
+            self.record(statement, (time.perf_counter() - started) * 1000)
+
+    def record(self, statement: str, elapsed_ms: float):
+        """Add one execution of ``statement`` to the recorded patterns."""
+        if statement.lstrip()[:6].upper() not in ("SELECT", "UPDATE", "DELETE"):
+            return
+        key = normalize_statement(statement)
+        with self._lock:
+            pattern = self.patterns.get(key)
+            if pattern is None:
+                pattern = self.patterns[key] = QueryPattern(key, parse_predicates(key))
+            pattern.count += 1
+            pattern.total_ms += elapsed_ms
+            pattern.max_ms = max(pattern.max_ms, elapsed_ms)
+            if elapsed_ms >= self.slow_query_ms:
+                pattern.slow_count += 1
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning("Slow query (%.1fms): %s", elapsed_ms, key)
+
+    def existing_indexes(
+        self, engine: Optional[Engine] = None, dialect: Optional[str] = None
+    ) -> Dict[str, Set[str]]:
+        """
+        Map each table to the leading expressions of its indexes.
+
+        Indexes declared on the models are included unless they are only created on
+        another dialect than ``dialect`` (by default, the dialect of ``engine``). When
+        ``engine`` is given, indexes that only exist in the database (e.g. created by
+        migrations) are included too.
+        """
+        from .base import created_on
+
+        if dialect is None and engine is not None:
+            dialect = engine.dialect.name
+        leading: Dict[str, Set[str]] = {}
+        for table in self.metadata.tables.values():
+            found = leading.setdefault(table.name, set())
+            found.update(column.name for column in list(table.primary_key.columns)[:1])
+            for index in table.indexes:
+                if dialect is not None and not created_on(index, dialect):
+                    continue
+                expression = index.expressions[0]
+                name = getattr(expression, "name", None) or str(expression)
+                found.add(_normalize_expression(name))
+        if engine is not None:
+            inspector = inspect(engine)
+            for table_name in inspector.get_table_names():
+                found = leading.setdefault(table_name, set())
+                for index in inspector.get_indexes(table_name):
+                    columns = index.get("column_names") or []
+                    if columns and columns[0]:
+                        found.add(columns[0])
+                    elif index.get("expressions"):
+                        found.add(_normalize_expression(index["expressions"][0]))
+        return leading
+
+    def propose(
+        self, engine: Optional[Engine] = None, dialect: Optional[str] = None
+    ) -> List[IndexProposal]:
+        """
+        Build index proposals for un-indexed predicates, most expensive first.
+        """
+        existing = self.existing_indexes(engine, dialect)
+        proposals: Dict[Tuple[str, Tuple[str, ...], Optional[str]], IndexProposal] = {}
+        for pattern in self.patterns.values():
+            for table_name, predicates in _group_by_table(pattern.predicates):
+                table = self.metadata.tables.get(table_name)
+                if table is None:
+                    continue
+                keys, flags = [], []
+                for predicate in predicates:
+                    column = table.columns.get(predicate.column)
+                    if column is None:
+                        continue
+                    if isinstance(column.type, Boolean):
+                        # Only a literal tells which rows a partial index should keep.
+                        if predicate.flag_condition is not None:
+                            flags.append(predicate.flag_condition)
+                    elif predicate.op in EQUALITY_OPS or predicate.op in RANGE_OPS:
+                        keys.append(predicate)
+                if not keys:
+                    continue
+                # Equality predicates first, so a composite index can serve all of them.
+                keys.sort(key=lambda p: p.op not in EQUALITY_OPS)
+                expressions = tuple(dict.fromkeys(p.expression for p in keys))[:3]
+                if _normalize_expression(expressions[0]) in existing.get(table_name, set()):
+                    continue
+
+                where = " AND ".join(dict.fromkeys(flags)) or None
+                key = (table_name, expressions, where)
+                proposal = proposals.get(key)
+                if proposal is None:
+                    reason = f"un-indexed filter on {', '.join(expressions)}"
+                    if where:
+                        reason += f" restricted to rows where {where}"
+                    proposal = proposals[key] = IndexProposal(
+                        table=table_name, expressions=list(expressions), where=where, reason=reason
+                    )
+                proposal.count += pattern.count
+                proposal.total_ms += pattern.total_ms
+        return sorted(proposals.values(), key=lambda p: p.total_ms, reverse=True)
+
+    def slow_patterns(self) -> List[QueryPattern]:
+        return sorted(
+            (p for p in self.patterns.values() if p.slow_count),
+            key=lambda p: p.total_ms,
+            reverse=True,
+        )
+
+    def save(self, path: Path):
+        """
+        Write the recorded patterns to ``path``, merging with a previous report.
+        """
+        merged = load_patterns(path) if path.exists() else {}
+        with self._lock:
+            for key, pattern in self.patterns.items():
+                previous = merged.get(key)
+                if previous is not None:
+                    pattern = QueryPattern(
+                        statement=key,
+                        predicates=pattern.predicates,
+                        count=pattern.count + previous.count,
+                        total_ms=pattern.total_ms + previous.total_ms,
+                        max_ms=max(pattern.max_ms, previous.max_ms),
+                        slow_count=pattern.slow_count + previous.slow_count,
+                    )
+                merged[key] = pattern
+        path.write_text(json.dumps([asdict(p) for p in merged.values()], indent=2))
+
+    def load(self, path: Path):
+        self.patterns = load_patterns(path)
+
+
+def load_patterns(path: Path) -> Dict[str, QueryPattern]:
+    patterns = {}
+    for entry in json.loads(path.read_text()):
+        entry["predicates"] = [Predicate(**p) for p in entry["predicates"]]
+        patterns[entry["statement"]] = QueryPattern(**entry)
+    return patterns
+
+
+def _normalize_expression(expression: str) -> str:
+    """Reduce ``lower((email)::text)``, ``lower("user".email)`` etc. to ``lower(email)``."""
+    expression = re.sub(r"::\w+|\"|\s", "", expression.lower())
+    expression = re.sub(r"\w+\.(\w+)", r"\1", expression)
+    while "((" in expression:
+        expression = expression.replace("((", "(").replace("))", ")")
+    return expression
+
+
+def _group_by_table(predicates: Iterable[Predicate]) -> List[Tuple[str, List[Predicate]]]:
+    grouped: Dict[str, List[Predicate]] = {}
+    for predicate in predicates:
+        grouped.setdefault(predicate.table, []).append(predicate)
+    return list(grouped.items())
+
+
+def write_migration(proposals: List[IndexProposal], message: str = "index advisor proposals"):
+    """
+    Generate an Alembic revision creating the proposed indexes.
+    """
+    import sqlalchemy as sa
+    from alembic import command
+    from alembic.operations import ops
+
+    from .base import get_alembic_config
+
+    def add_operations(context, revision, directives):
+        script = directives[0]
+        for proposal in proposals:
+            kwargs = {}
+            if proposal.where:
+                kwargs["postgresql_where"] = sa.text(proposal.where)
+                kwargs["sqlite_where"] = sa.text(proposal.where)
+            columns = [
+                sa.text(expression) if "(" in expression else expression
+                for expression in proposal.expressions
+            ]
+            script.upgrade_ops.ops.append(
+                ops.CreateIndexOp(proposal.name, proposal.table, columns, **kwargs)
+            )
+            script.downgrade_ops.ops.insert(
+                0, ops.DropIndexOp(proposal.name, table_name=proposal.table)
+            )
+
+    config = get_alembic_config()
+    # Revision hooks only run when the migration environment is loaded.
+    config.set_main_option("revision_environment", "true")
+    return command.revision(config, message=message, process_revision_directives=add_operations)
+
+
+@click.command()
+@click.option("--report", "report_path", type=click.Path(path_type=Path), default=None)
+@click.option("--write", is_flag=True, help="Write the proposals as an Alembic migration.")
+def main(report_path: Optional[Path], write: bool):
+    """Show (and optionally write) index proposals from a recorded advisor report."""
+    from sqlmodel import SQLModel
+
+    from ..core.config import settings
+    from .base import sync_engine
+    from .models import user  # noqa: F401
+
+    report_path = report_path or settings.INDEX_ADVISOR_REPORT_PATH
+    if not report_path.exists():
+        raise click.ClickException(
+            f"No advisor report at {report_path}. Run the app with INDEX_ADVISOR_ENABLED=true "
+            "and exercise it first."
+        )
+
+    advisor = IndexAdvisor(SQLModel.metadata, settings.INDEX_ADVISOR_SLOW_QUERY_MS)
+    advisor.load(report_path)
+
+    try:
+        proposals = advisor.propose(sync_engine)
+    except Exception as e:
+        click.echo(f"Could not inspect the database ({e}); using model indexes only.")
+        proposals = advisor.propose(dialect=sync_engine.dialect.name)
+
+    for pattern in advisor.slow_patterns():
+        click.echo(
+            f"slow: {pattern.slow_count}/{pattern.count} runs, max {pattern.max_ms:.1f}ms: "
+            f"{pattern.statement}"
+        )
+    if not proposals:
+        click.echo("No index proposals.")
+        return
+    for proposal in proposals:
+        click.echo(
+            f"{proposal.sql};\n  -- {proposal.reason} "
+            f"({proposal.count} queries, {proposal.total_ms:.1f}ms total)"
+        )
+    if write:
+        script = write_migration(proposals)
+        click.echo(f"Wrote migration {script.path}")
+
+
+if __name__ == "__main__":
+    main()
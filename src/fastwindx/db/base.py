@@ -3,48 +3,268 @@ Database configuration and session management for FastWindX.
 """
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import Index, event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy_utils import create_database, database_exists
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ..core.admission import load_monitor
 from ..core.config import settings
 
-# Create async engine
-async_engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=True, future=True)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that reports how long checkouts wait, for admission control.
+
+    SQLAlchemy has no event marking the start of a checkout (``checkout`` and
+    ``connect`` fire once a connection is at hand), so this overrides the private
+    ``QueuePool._do_get``; re-check it when upgrading SQLAlchemy. The measured time
+    includes opening a new connection when the pool has none idle, which is part of
+    what a request waits for but not strictly queueing.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            load_monitor.record_pool_wait(time.perf_counter() - started)
+
+
+database_url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+is_sqlite = database_url.get_backend_name() == "sqlite"
+# An in-memory SQLite database lives in a single connection: every other engine (or
+# pool connection) would open a separate, empty database.
+is_sqlite_memory = is_sqlite and database_url.database in (None, "", ":memory:")
+
+
+def _engine_options() -> Dict[str, Any]:
+    # In-memory databases keep the driver's default single-connection pool.
+    if is_sqlite_memory:
+        return {}
+    return {"poolclass": InstrumentedQueuePool}
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection for a web app serving concurrent requests.
+
+    WAL lets readers run while a write is in progress, ``synchronous=NORMAL`` is safe
+    with WAL and avoids an fsync per commit, and the busy timeout makes connections wait
+    for a lock held elsewhere instead of failing right away.
+
+    The driver's own transaction handling is disabled so that SQLAlchemy emits BEGIN
+    itself (see ``_begin_sqlite_transaction``), which SAVEPOINTs depend on.
+    """
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode=WAL",
+        "synchronous=NORMAL",
+        f"mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        "foreign_keys=ON",
+        "temp_store=MEMORY",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+def _begin_sqlite_transaction(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+def _begin_sqlite_write_transaction(connection):
+    # Take the write lock up front: a deferred transaction that starts writing after
+    # another connection committed fails with SQLITE_BUSY instead of waiting.
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _setup_sqlite_engine(sync_engine, writer: bool = False):
+    event.listen(sync_engine, "connect", configure_sqlite_connection)
+    event.listen(
+        sync_engine,
+        "begin",
+        _begin_sqlite_write_transaction if writer else _begin_sqlite_transaction,
+    )
+
+
+# Create async engine. SQL statement logging is controlled by LOG_SQL (see core.logs) rather
+# than echo, which writes synchronously to stdout.
+async_engine = create_async_engine(database_url, echo=False, future=True, **_engine_options())
+
+# With SQLite, all writes go through a single dedicated connection: sessions wait their
+# turn in its pool instead of competing for the database lock (see ``RoutingSession``).
+# An in-memory database already has a single connection, which takes the writes too.
+if is_sqlite and settings.SQLITE_SINGLE_WRITER and not is_sqlite_memory:
+    async_write_engine = create_async_engine(
+        database_url,
+        echo=False,
+        future=True,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS,
+        **_engine_options(),
+    )
+else:
+    async_write_engine = async_engine
 
 # Create sync engine for Alembic migrations and database creation
 sync_engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", ""), echo=True, future=True
+    database_url.set(drivername=database_url.get_backend_name()), echo=False, future=True
 )
 
+if is_sqlite:
+    _setup_sqlite_engine(async_engine.sync_engine)
+    _setup_sqlite_engine(sync_engine)
+    if async_write_engine is not async_engine:
+        _setup_sqlite_engine(async_write_engine.sync_engine, writer=True)
+
 # Export sync_engine as engine for compatibility
 engine = sync_engine
 
-async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+class RoutingSession(Session):
+    """
+    Session sending writes to ``async_write_engine`` and everything else to
+    ``async_engine``.
+
+    Once a transaction has written, the rest of it (including reads of what it just
+    wrote) stays on the writer connection until it is committed or rolled back. Sessions
+    bound to something else, such as a test connection, are left alone.
+    """
+
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.bind is not async_engine.sync_engine:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._writing or self._flushing or getattr(clause, "is_dml", False):
+            self._writing = True
+            return async_write_engine.sync_engine
+        return async_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+
+async_session = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession if async_write_engine is not async_engine else Session,
+    expire_on_commit=False,
+)
 
 
 def create_db_if_not_exists():
     """
     Create the database if it doesn't exist using synchronous operations.
+
+    SQLite creates the database file on first connect; only its directory is created.
     """
+    if is_sqlite:
+        if not is_sqlite_memory:
+            Path(database_url.database).parent.mkdir(parents=True, exist_ok=True)
+        return
     if not database_exists(sync_engine.url):
         create_database(sync_engine.url)
 
 
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Revision matching the schema that ``SQLModel.metadata.create_all`` used to create.
+BASELINE_REVISION = "0001"
+
+# Format new revisions like the rest of the code (black style, isort profile "black").
+# Keep in sync with the [post_write_hooks] section of alembic.ini.
+POST_WRITE_HOOKS = {
+    "hooks": "ruff_imports, ruff_format",
+    "ruff_imports.type": "exec",
+    "ruff_imports.executable": "ruff",
+    "ruff_imports.options": "check --fix --select I --line-length 100 REVISION_SCRIPT_FILENAME",
+    "ruff_format.type": "exec",
+    "ruff_format.executable": "ruff",
+    "ruff_format.options": "format --line-length 100 REVISION_SCRIPT_FILENAME",
+}
+
+
+def get_alembic_config():
+    """
+    Build an Alembic config pointing at the bundled migrations.
+    """
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.set_main_option("file_template", "%%(year)d%%(month).2d%%(day).2d_%%(rev)s_%%(slug)s")
+    for name, value in POST_WRITE_HOOKS.items():
+        config.set_section_option("post_write_hooks", name, value)
+    return config
+
+
+def created_on(index: Index, dialect_name: str) -> bool:
+    """
+    Whether ``index`` is created on a database of the dialect ``dialect_name``.
+
+    Indexes declared with ``Index(...).ddl_if(dialect=...)`` only exist on that dialect.
+    """
+    ddl_if = index._ddl_if
+    if ddl_if is None or ddl_if.dialect is None:
+        return True
+    dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+    return dialect_name in dialects
+
+
+def upgrade_db(revision: str = "head", connection=None):
+    """
+    Upgrade the database schema to ``revision`` using Alembic.
+
+    Migrations run on ``connection`` if one is given. Databases created before
+    migrations were introduced are stamped with ``BASELINE_REVISION`` by the migration
+    environment.
+    """
+    from alembic import command
+
+    config = get_alembic_config()
+    if connection is not None:
+        config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+
+
 async def init_db():
     """
-    Initialize the database by creating it if it doesn't exist and then creating all tables.
+    Initialize the database by creating it if it doesn't exist and then migrating it.
     """
-    # Run the synchronous database creation in a separate thread
+    # Run the synchronous database creation and migrations in a separate thread
+    if is_sqlite_memory:
+        # Always starts empty. Migrate the app's own connection: the sync engine's would
+        # be another database.
+        async with async_engine.begin() as connection:
+            await connection.run_sync(lambda c: upgrade_db(connection=c))
+        return
     loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, create_db_if_not_exists)
+    if settings.DB_AUTO_MIGRATE:
+        await loop.run_in_executor(None, upgrade_db)
+
 
-    # Now we can use the async engine to create tables
-    async with async_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+async def close_db():
+    """Close the connections of the database engines."""
+    await async_engine.dispose()
+    if async_write_engine is not async_engine:
+        await async_write_engine.dispose()
 
 
 @asynccontextmanager
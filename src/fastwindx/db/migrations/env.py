@@ -0,0 +1,108 @@
+"""
+Alembic migration environment for FastWindX.
+"""
+
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import inspect, pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from fastwindx.core.config import settings
+from fastwindx.db.base import BASELINE_REVISION, created_on
+from fastwindx.db.models import user  # noqa: F401  (register models on the metadata)
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Leave indexes of other dialects out of autogenerate.
+
+    Without this, the Postgres-only search indexes would be proposed on SQLite, and
+    rendered with their Postgres options.
+    """
+    if type_ == "index" and not reflected:
+        return created_on(object, context.get_context().dialect.name)
+    return True
+
+
+def run_migrations_offline() -> None:
+    """
+    Run migrations in 'offline' mode, emitting SQL instead of executing it.
+    """
+    context.configure(
+        url=settings.SQLALCHEMY_DATABASE_URI,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def stamp_legacy_database(connection: Connection) -> None:
+    """
+    Stamp a database created before migrations were introduced with the baseline.
+
+    Such a database has the ``user`` table but no revision, so only the migrations
+    newer than the baseline are applied to it. An empty ``alembic_version`` table, as
+    left behind by a failed run, counts as no revision.
+    """
+    migration_context = context.get_context()
+    if migration_context.get_current_revision() is not None:
+        return
+    if "user" in inspect(connection).get_table_names():
+        migration_context.stamp(context.script, BASELINE_REVISION)
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        stamp_legacy_database(connection)
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    """
+    Run migrations in 'online' mode against the configured database.
+
+    A connection passed in through ``config.attributes["connection"]`` is used as is,
+    which lets callers run migrations inside their own transaction.
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
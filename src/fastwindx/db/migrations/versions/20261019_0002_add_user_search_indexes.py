@@ -0,0 +1,51 @@
+"""add user search indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_COLUMNS = ("username", "email", "first_name", "last_name")
+PREFIX_COLUMNS = ("username", "email")
+
+
+def upgrade() -> None:
+    # Other databases search through an in-process index instead.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f"ix_user_{column}_trgm",
+            "user",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+    for column in PREFIX_COLUMNS:
+        op.create_index(
+            f"ix_user_{column}_prefix",
+            "user",
+            [sa.text(f"lower({column}) text_pattern_ops")],
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in PREFIX_COLUMNS:
+        op.drop_index(f"ix_user_{column}_prefix", table_name="user")
+    for column in TRIGRAM_COLUMNS:
+        op.drop_index(f"ix_user_{column}_trgm", table_name="user")
@@ -1,8 +1,14 @@
+from datetime import datetime, timezone
 from typing import Optional
 
+from sqlalchemy import DDL, Index, event, func
 from sqlmodel import Field, SQLModel
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str = Field(unique=True, index=True)
@@ -13,3 +19,32 @@ class User(SQLModel, table=True):
     role: str
     is_active: bool = Field(default=True)
     phone_number: str
+    # Grows by one on every change; the ETag of the user (see utils.conditional).
+    version: int = Field(default=1)
+    updated_at: datetime = Field(default_factory=utcnow)
+
+
+# Search indexes (Postgres only): trigram indexes serve fuzzy matches and prefix
+# matches of three characters or more, the lower() prefix indexes shorter prefixes.
+SEARCH_COLUMNS = ("username", "email", "first_name", "last_name")
+
+for _name in SEARCH_COLUMNS:
+    Index(
+        f"ix_user_{_name}_trgm",
+        User.__table__.c[_name],
+        postgresql_using="gin",
+        postgresql_ops={_name: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+for _name in ("username", "email"):
+    Index(
+        f"ix_user_{_name}_prefix",
+        func.lower(User.__table__.c[_name]).label(f"{_name}_lower"),
+        postgresql_ops={f"{_name}_lower": "text_pattern_ops"},
+    ).ddl_if(dialect="postgresql")
+
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
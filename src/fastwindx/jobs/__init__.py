@@ -0,0 +1,9 @@
+"""
+Background job queue for work that should not delay the response.
+"""
+
+from . import tasks  # noqa: F401  (registers the built-in jobs)
+from .queue import Job, JobException, JobQueue, enqueue, get_queue, job, set_queue
+from .worker import Worker
+
+__all__ = ["Job", "JobException", "JobQueue", "Worker", "enqueue", "get_queue", "job", "set_queue"]
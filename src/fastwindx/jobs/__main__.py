@@ -0,0 +1,51 @@
+"""
+Standalone job worker process, started with ``fastwindx worker``.
+"""
+
+import asyncio
+import logging
+import signal
+
+import click
+
+from ..core.config import settings
+from ..core.logs import setup_logging, shutdown_logging
+from . import Worker, get_queue
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(concurrency: int):
+    queue = get_queue()
+    worker = Worker(queue, concurrency=concurrency)
+    worker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info("Shutting down job worker.")
+    await worker.stop()
+    await queue.close()
+
+
+@click.command()
+@click.option("--concurrency", default=settings.JOB_CONCURRENCY, show_default=True)
+def main(concurrency: int):
+    """Run a FastWindX job worker."""
+    if settings.JOB_BACKEND == "memory":
+        raise click.ClickException(
+            "JOB_BACKEND is 'memory'; jobs run inside the web process. "
+            "Set JOB_BACKEND=redis to use standalone workers."
+        )
+    setup_logging(settings)
+    try:
+        asyncio.run(serve(concurrency))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Storage backends for the background job queue.
+
+``InMemoryBackend`` keeps jobs in the web process and is meant to be consumed by the
+in-process worker. ``RedisBackend`` persists jobs in Redis so that they survive
+restarts and can be consumed by separate ``fastwindx worker`` processes.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .queue import Job
+
+
+class JobBackend:
+    """
+    Interface implemented by job backends.
+    """
+
+    async def push(self, job: Job):
+        """Store a job to run at ``job.run_at``."""
+        raise NotImplementedError
+
+    async def reserve(self, limit: int) -> List[Job]:
+        """Claim up to ``limit`` due jobs for execution."""
+        raise NotImplementedError
+
+    async def ack(self, job: Job):
+        """Mark a claimed job as done."""
+        raise NotImplementedError
+
+    async def retry(self, job: Job):
+        """Reschedule a claimed job at its (updated) ``run_at``."""
+        raise NotImplementedError
+
+    async def fail(self, job: Job):
+        """Move a claimed job that exhausted its retries to the dead letter list."""
+        raise NotImplementedError
+
+    async def wait(self, timeout: float):
+        """Wait until new jobs may be available, or ``timeout`` elapses."""
+        await asyncio.sleep(timeout)
+
+    async def close(self):
+        pass
+
+
+class InMemoryBackend(JobBackend):
+    """
+    Process-local backend based on a heap ordered by ``run_at``.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+        self._in_flight: Dict[str, Job] = {}
+        self._wakeup = asyncio.Event()
+        self.dead: List[Job] = []
+
+    async def push(self, job: Job):
+        heapq.heappush(self._heap, (job.run_at, next(self._counter), job))
+        self._wakeup.set()
+
+    async def reserve(self, limit: int) -> List[Job]:
+        now = time.time()
+        jobs = []
+        while self._heap and len(jobs) < limit and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            self._in_flight[job.id] = job
+            jobs.append(job)
+        return jobs
+
+    async def ack(self, job: Job):
+        self._in_flight.pop(job.id, None)
+
+    async def retry(self, job: Job):
+        self._in_flight.pop(job.id, None)
+        await self.push(job)
+
+    async def fail(self, job: Job):
+        self._in_flight.pop(job.id, None)
+        self.dead.append(job)
+
+    async def wait(self, timeout: float):
+        if self._heap:
+            # Sleep no longer than until the next scheduled job is due.
+            timeout = max(0.0, min(timeout, self._heap[0][0] - time.time()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def __len__(self):
+        return len(self._heap) + len(self._in_flight)
+
+
+class RedisBackend(JobBackend):
+    """
+    Durable backend storing jobs in Redis.
+
+    Layout (all keys share ``prefix``):
+
+    - ``<prefix>:jobs`` hash of job id to serialized job
+    - ``<prefix>:scheduled`` sorted set of job ids scored by ``run_at``
+    - ``<prefix>:processing`` sorted set of claimed job ids scored by lease expiry
+    - ``<prefix>:dead`` list of serialized jobs that exhausted their retries
+
+    Claimed jobs whose lease expires (e.g. because the worker crashed) are moved back to
+    ``scheduled`` and run again, so job functions should be idempotent.
+
+    Any ``redis.asyncio`` compatible client can be passed in, including a local stand-in
+    such as ``fakeredis.aioredis.FakeRedis``.
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix: str = "fastwindx:jobs",
+        visibility_timeout: int = 300,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.jobs_key = f"{prefix}:jobs"
+        self.scheduled_key = f"{prefix}:scheduled"
+        self.processing_key = f"{prefix}:processing"
+        self.dead_key = f"{prefix}:dead"
+
+    @classmethod
+    def from_settings(cls) -> "RedisBackend":
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        return cls(
+            client,
+            prefix=settings.JOB_REDIS_PREFIX,
+            visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+        )
+
+    async def push(self, job: Job):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.jobs_key, job.id, job.to_json())
+            pipe.zadd(self.scheduled_key, {job.id: job.run_at})
+            await pipe.execute()
+
+    async def reserve(self, limit: int) -> List[Job]:
+        await self._requeue_expired()
+        ids = await self._claim(self.scheduled_key, limit, time.time() + self.visibility_timeout)
+        if not ids:
+            return []
+        payloads = await self.client.hmget(self.jobs_key, ids)
+        return [Job.from_json(payload) for payload in payloads if payload is not None]
+
+    async def ack(self, job: Job):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, job.id)
+            pipe.hdel(self.jobs_key, job.id)
+            await pipe.execute()
+
+    async def retry(self, job: Job):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.jobs_key, job.id, job.to_json())
+            pipe.zrem(self.processing_key, job.id)
+            pipe.zadd(self.scheduled_key, {job.id: job.run_at})
+            await pipe.execute()
+
+    async def fail(self, job: Job):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, job.id)
+            pipe.hdel(self.jobs_key, job.id)
+            pipe.rpush(self.dead_key, job.to_json())
+            await pipe.execute()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _requeue_expired(self):
+        await self._claim(self.processing_key, None, None, target=self.scheduled_key)
+
+    async def _claim(
+        self,
+        source: str,
+        limit: Optional[int],
+        score: Optional[float],
+        target: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Atomically move due members of ``source`` into ``target`` (``processing`` by
+        default) using an optimistic WATCH/MULTI transaction.
+        """
+        from redis.exceptions import WatchError
+
+        target = target or self.processing_key
+        while True:
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(source)
+                    now = time.time()
+                    if limit is None:
+                        ids = await pipe.zrangebyscore(source, "-inf", now)
+                    else:
+                        ids = await pipe.zrangebyscore(source, "-inf", now, start=0, num=limit)
+                    if not ids:
+                        await pipe.unwatch()
+                        return []
+                    ids = [i.decode() if isinstance(i, bytes) else i for i in ids]
+                    pipe.multi()
+                    pipe.zrem(source, *ids)
+                    pipe.zadd(target, {i: now if score is None else score for i in ids})
+                    await pipe.execute()
+                    return ids
+                except WatchError:
+                    continue
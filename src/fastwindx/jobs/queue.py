@@ -0,0 +1,198 @@
+"""
+Job definitions, registry and the queue used to enqueue background work.
+"""
+
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..core.config import settings
+from ..core.exceptions import FastWindXException
+from ..core.logs import request_id_var
+
+
+class JobException(FastWindXException):
+    """
+    Exception raised for background job errors.
+    """
+
+    pass
+
+
+@dataclass
+class Job:
+    """
+    A unit of background work, serializable so it can be stored by any backend.
+    """
+
+    name: str
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    max_retries: int = 0
+    run_at: float = field(default_factory=time.time)
+    enqueued_at: float = field(default_factory=time.time)
+    last_error: Optional[str] = None
+    request_id: Optional[str] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "Job":
+        return cls(**json.loads(data))
+
+
+@dataclass
+class JobDefinition:
+    """
+    A registered job function and its retry policy.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    max_retries: int
+    retry_backoff: float
+
+
+_registry: Dict[str, JobDefinition] = {}
+
+
+def job(
+    func: Optional[Callable[..., Any]] = None,
+    *,
+    name: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    retry_backoff: Optional[float] = None,
+):
+    """
+    Register a function as a background job.
+
+    Can be used bare (``@job``) or with options (``@job(name="...", max_retries=5)``).
+    Job arguments must be JSON serializable so that durable backends can store them.
+    """
+
+    def decorator(f: Callable[..., Any]) -> Callable[..., Any]:
+        job_name = name or f"{f.__module__}.{f.__qualname__}"
+        if job_name in _registry and _registry[job_name].func is not f:
+            raise JobException(f"Job '{job_name}' is already registered")
+        _registry[job_name] = JobDefinition(
+            name=job_name,
+            func=f,
+            max_retries=settings.JOB_MAX_RETRIES if max_retries is None else max_retries,
+            retry_backoff=(
+                settings.JOB_RETRY_BACKOFF_SECONDS if retry_backoff is None else retry_backoff
+            ),
+        )
+        f.job_name = job_name
+        return f
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_job_definition(name: str) -> Optional[JobDefinition]:
+    """Return the registered definition for a job name, if any."""
+    return _registry.get(name)
+
+
+def resolve_job_name(func_or_name: Union[str, Callable[..., Any]]) -> str:
+    if isinstance(func_or_name, str):
+        return func_or_name
+    job_name = getattr(func_or_name, "job_name", None)
+    if job_name is None:
+        raise JobException(f"{func_or_name!r} is not a registered job")
+    return job_name
+
+
+class JobQueue:
+    """
+    Front door for enqueueing jobs onto a backend.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def enqueue(
+        self,
+        func_or_name: Union[str, Callable[..., Any]],
+        *args: Any,
+        _delay: Optional[float] = None,
+        _eta: Optional[datetime] = None,
+        **kwargs: Any,
+    ) -> Job:
+        """
+        Enqueue a job and return immediately.
+
+        ``_delay`` (seconds) or ``_eta`` (an aware or local datetime) schedule the job
+        for later instead of running it as soon as a worker is free.
+        """
+        job_name = resolve_job_name(func_or_name)
+        definition = get_job_definition(job_name)
+        if definition is None:
+            raise JobException(f"Job '{job_name}' is not registered")
+
+        run_at = time.time()
+        if _eta is not None:
+            run_at = _eta.timestamp()
+        elif _delay is not None:
+            run_at += _delay
+
+        queued = Job(
+            name=job_name,
+            args=list(args),
+            kwargs=kwargs,
+            max_retries=definition.max_retries,
+            run_at=run_at,
+            request_id=request_id_var.get(),
+        )
+        await self.backend.push(queued)
+        return queued
+
+    async def close(self):
+        await self.backend.close()
+
+
+_queue: Optional[JobQueue] = None
+
+
+def create_backend(backend: Optional[str] = None):
+    """
+    Build the job backend configured in settings.
+    """
+    from .backends import InMemoryBackend, RedisBackend
+
+    backend = backend or settings.JOB_BACKEND
+    if backend == "memory":
+        return InMemoryBackend()
+    if backend == "redis":
+        return RedisBackend.from_settings()
+    raise JobException(f"Unknown job backend '{backend}'")
+
+
+def get_queue() -> JobQueue:
+    """
+    Return the process-wide job queue, creating it on first use.
+    """
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(create_backend())
+    return _queue
+
+
+def set_queue(queue: Optional[JobQueue]):
+    """
+    Replace the process-wide job queue, e.g. with one backed by a stand-in Redis.
+    """
+    global _queue
+    _queue = queue
+
+
+async def enqueue(func_or_name: Union[str, Callable[..., Any]], *args: Any, **kwargs: Any) -> Job:
+    """Enqueue a job on the process-wide queue."""
+    return await get_queue().enqueue(func_or_name, *args, **kwargs)
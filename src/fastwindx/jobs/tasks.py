@@ -0,0 +1,34 @@
+"""
+Background jobs run after a request has been answered.
+"""
+
+import logging
+from typing import Any, Optional
+
+from ..db.base import get_session
+from ..db.models.user import User
+from .queue import job
+
+logger = logging.getLogger(__name__)
+
+
+@job(name="users.send_welcome_email")
+async def send_welcome_email(user_id: int):
+    """
+    Send the welcome email to a newly registered user.
+    """
+    async with get_session() as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        logger.warning("Not sending welcome email, user %s no longer exists.", user_id)
+        return
+    # Plug your mail provider in here.
+    logger.info("Sending welcome email to %s.", user.email)
+
+
+@job(name="audit.record_event")
+async def record_audit_event(event: str, user_id: Optional[int] = None, **data: Any):
+    """
+    Record an audit event outside of the request path.
+    """
+    logger.info("Audit event %s for user %s: %s", event, user_id, data)
@@ -0,0 +1,136 @@
+"""
+Worker executing queued jobs with bounded concurrency and retries.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Set
+
+from ..core.config import settings
+from ..core.logs import request_id_var
+from .queue import Job, JobQueue, get_job_definition
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Pulls due jobs from a queue's backend and runs them.
+
+    At most ``concurrency`` jobs run at once. Failed jobs are retried with exponential
+    backoff (``retry_backoff * 2 ** (attempt - 1)`` seconds) until their ``max_retries``
+    is exhausted, after which they are moved to the backend's dead letter storage.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.queue = queue
+        self.backend = queue.backend
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL_SECONDS
+        self._active: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Run the worker loop as a background task of the current event loop."""
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        logger.info("Job worker started with concurrency %s.", self.concurrency)
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._active)
+            if free <= 0:
+                # Wake up when a job finishes or when asked to stop, whichever comes first.
+                stopping = asyncio.ensure_future(self._stopping.wait())
+                await asyncio.wait({*self._active, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                stopping.cancel()
+                continue
+
+            try:
+                jobs = await self.backend.reserve(free)
+            except Exception:
+                logger.exception("Failed to reserve jobs, retrying in %ss.", self.poll_interval)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            for job in jobs:
+                task = asyncio.create_task(self._execute(job))
+                self._active.add(task)
+                task.add_done_callback(self._active.discard)
+
+            if not jobs:
+                await self.backend.wait(self.poll_interval)
+        logger.info("Job worker stopped.")
+
+    async def stop(self, timeout: float = 30.0):
+        """
+        Stop reserving new jobs and wait up to ``timeout`` for running ones.
+
+        Jobs still running after the timeout are cancelled without being acknowledged.
+        """
+        self._stopping.set()
+        deadline = time.monotonic() + timeout
+        if self._task is not None:
+            _, pending = await asyncio.wait({self._task}, timeout=timeout)
+            if pending:
+                self._task.cancel()
+        if self._active:
+            remaining = max(deadline - time.monotonic(), 0)
+            _, pending = await asyncio.wait(self._active, timeout=remaining)
+            for task in pending:
+                logger.warning("Job still running after %ss, cancelling it.", timeout)
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+    async def _execute(self, job: Job):
+        definition = get_job_definition(job.name)
+        if definition is None:
+            job.last_error = f"Job '{job.name}' is not registered"
+            logger.error(job.last_error)
+            await self.backend.fail(job)
+            return
+
+        # Log records of the job are correlated with the request that enqueued it.
+        request_id_var.set(job.request_id)
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(definition.func):
+                await definition.func(*job.args, **job.kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, lambda: definition.func(*job.args, **job.kwargs))
+        except Exception as e:
+            job.attempts += 1
+            job.last_error = repr(e)
+            if job.attempts > job.max_retries:
+                logger.exception("Job %s (%s) failed permanently.", job.name, job.id)
+                await self.backend.fail(job)
+            else:
+                delay = definition.retry_backoff * 2 ** (job.attempts - 1)
+                job.run_at = time.time() + delay
+                logger.warning(
+                    "Job %s (%s) failed on attempt %s, retrying in %.1fs: %s",
+                    job.name,
+                    job.id,
+                    job.attempts,
+                    delay,
+                    job.last_error,
+                )
+                await self.backend.retry(job)
+            return
+
+        await self.backend.ack(job)
+        logger.debug(
+            "Job %s (%s) finished in %.1fms.",
+            job.name,
+            job.id,
+            (time.perf_counter() - started) * 1000,
+        )
@@ -8,11 +8,18 @@ from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from fastwindx.api.v1.api import api_router
+from fastwindx.core.admission import AdmissionControlMiddleware, load_monitor
 from fastwindx.core.config import settings
-from fastwindx.db.base import init_db
+from fastwindx.core.health import health_monitor
+from fastwindx.core.logs import RequestIdMiddleware, setup_logging, shutdown_logging
+from fastwindx.core.profiling import ProfilingMiddleware, install_sql_hooks
+from fastwindx.db.base import async_engine, async_write_engine, close_db, init_db
+from fastwindx.jobs import Worker, get_queue
+from fastwindx.utils.singleflight import singleflight_stats
 from fastwindx.views.main import router as main_router
 
 logger = logging.getLogger(__name__)
@@ -23,12 +30,48 @@ async def lifespan(app: FastAPI):
     """
     Lifespan context manager for the FastAPI app.
     """
+    setup_logging(settings)
     logger.info("Initializing database connection.")
     await init_db()
     logger.info("Database connection initialized.")
+
+    load_monitor.start()
+    health_monitor.start()
+
+    advisor = None
+    if settings.INDEX_ADVISOR_ENABLED:
+        from sqlmodel import SQLModel
+
+        from fastwindx.db.advisor import IndexAdvisor
+
+        advisor = IndexAdvisor(SQLModel.metadata, settings.INDEX_ADVISOR_SLOW_QUERY_MS)
+        advisor.install(async_engine.sync_engine)
+        if async_write_engine is not async_engine:
+            advisor.install(async_write_engine.sync_engine)
+        logger.info("Index advisor enabled, report: %s", settings.INDEX_ADVISOR_REPORT_PATH)
+
+    queue = get_queue()
+    worker = None
+    if settings.JOB_BACKEND == "memory" or settings.JOB_IN_PROCESS_WORKER:
+        worker = Worker(queue)
+        worker.start()
+        logger.info("In-process job worker started.")
+
     logger.info("App started.")
     yield
     logger.info("App shutting down.")
+    await health_monitor.stop()
+    await load_monitor.stop()
+    if worker is not None:
+        await worker.stop()
+    await queue.close()
+    if advisor is not None:
+        advisor.uninstall(async_engine.sync_engine)
+        if async_write_engine is not async_engine:
+            advisor.uninstall(async_write_engine.sync_engine)
+        advisor.save(settings.INDEX_ADVISOR_REPORT_PATH)
+    await close_db()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -37,7 +80,17 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Set all CORS enabled origins
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+if settings.PROFILING_ENABLED:
+    install_sql_hooks(async_engine.sync_engine)
+    if async_write_engine is not async_engine:
+        install_sql_hooks(async_write_engine.sync_engine)
+    app.add_middleware(ProfilingMiddleware)
+
+# Set all CORS enabled origins. Added after the middleware above so that it wraps them:
+# responses they produce, like the 503 of admission control, are readable by browsers.
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
         CORSMiddleware,
@@ -45,8 +98,18 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-Total-Count",
+            "X-Total-Count-Exact",
+            "Link",
+            "ETag",
+            "Retry-After",
+            "X-Request-ID",
+        ],
     )
 
+app.add_middleware(RequestIdMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
@@ -57,8 +120,31 @@ app.include_router(main_router)
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health():
     """
-    Health check endpoint.
+    Liveness probe: the process is up and serving requests.
     """
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: dependencies are reachable and the worker is not overloaded.
+
+    Dependency checks are refreshed in the background, so this never queries them. The
+    single-flight counters show how many lookups were served by a concurrent one.
+    """
+    overload_reason = load_monitor.overload_reason()
+    ready = health_monitor.healthy and overload_reason is None
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "checks": health_monitor.snapshot(),
+            "load": {**load_monitor.snapshot(), "overloaded": overload_reason},
+            "singleflight": singleflight_stats(),
+        },
+        headers={"Cache-Control": "no-store"},
+    )
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class UserCreate(BaseModel):
@@ -12,6 +14,8 @@ class UserCreate(BaseModel):
 
 
 class User(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     username: str
     email: str
@@ -20,6 +24,7 @@ class User(BaseModel):
     role: str
     is_active: bool
     phone_number: str
+    version: int
 
 
 class Token(BaseModel):
@@ -31,3 +36,13 @@ class TokenData(BaseModel):
     username: str | None = None
     id: int | None = None
     role: str | None = None
+
+
+class UserIds(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+
+class UserBatchResult(BaseModel):
+    id: int
+    status: str  # "ok", "not_found" or "forbidden"
+    user: User | None = None
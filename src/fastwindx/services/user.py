@@ -0,0 +1,156 @@
+"""
+User queries shared by the API endpoints and views.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import Integer, any_, bindparam, delete, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db.base import get_session
+from ..db.models.user import User, utcnow
+from ..jobs import enqueue
+from ..jobs.tasks import record_audit_event, send_welcome_email
+from ..utils.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+
+def _id_filter(db: AsyncSession, ids: Sequence[int]):
+    """
+    Match ``User.id`` against a list of ids in a single predicate.
+
+    On Postgres this is ``id = ANY(:ids)`` with one array parameter, so the statement
+    (and its cached plan) is the same whatever the number of ids. Other databases use
+    an expanding ``IN``.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return User.id == any_(bindparam("ids", list(ids), type_=ARRAY(Integer)))
+    return User.id.in_(list(ids))
+
+
+@singleflight(name="users.by_email")
+async def load_user_by_email(email: str) -> Optional[User]:
+    """
+    Load a user by email in a short-lived session of its own.
+
+    Concurrent lookups of the same email share one query. The returned instance is
+    detached and shared between callers; use ``session.merge(user, load=False)`` to get
+    a copy bound to a request session before modifying it.
+    """
+    async with get_session() as session:
+        return (await session.exec(select(User).where(User.email == email))).first()
+
+
+@singleflight(name="users.by_id")
+async def load_user(user_id: int) -> Optional[User]:
+    """
+    Load a user by id in a short-lived session of its own.
+
+    Concurrent lookups of the same id share one query; treat the result as read-only.
+    """
+    async with get_session() as session:
+        return await session.get(User, user_id)
+
+
+async def get_users_by_ids(db: AsyncSession, ids: Sequence[int]) -> Dict[int, User]:
+    """
+    Load the users with the given ids in one query, keyed by id.
+    """
+    result = await db.exec(select(User).where(_id_filter(db, ids)))
+    return {user.id: user for user in result}
+
+
+async def deactivate_users(db: AsyncSession, ids: Sequence[int]) -> Set[int]:
+    """
+    Deactivate the users with the given ids in one statement and return the ids found.
+    """
+    result = await db.exec(
+        update(User)
+        .where(_id_filter(db, ids))
+        .values(is_active=False, version=User.version + 1, updated_at=utcnow())
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    found = set(result.scalars())
+    await db.commit()
+    return found
+
+
+async def delete_users(db: AsyncSession, ids: Sequence[int]) -> Set[int]:
+    """
+    Delete the users with the given ids in one statement and return the ids found.
+    """
+    result = await db.exec(
+        delete(User)
+        .where(_id_filter(db, ids))
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    found = set(result.scalars())
+    await db.commit()
+    return found
+
+
+async def update_user(
+    db: AsyncSession, user_id: int, values: Dict[str, Any], versions: Optional[Sequence[int]] = None
+) -> Optional[User]:
+    """
+    Update a user in one statement and return it, bumping its version.
+
+    With ``versions``, the user is only updated if its current version is one of them
+    (an ``If-Match`` precondition). Returns ``None`` if the user is missing or the
+    precondition failed.
+    """
+    statement = update(User).where(User.id == user_id)
+    if versions is not None:
+        statement = statement.where(User.version.in_(list(versions)))
+    result = await db.exec(
+        statement.values(**values, version=User.version + 1, updated_at=utcnow())
+        .returning(User)
+        .execution_options(populate_existing=True)
+    )
+    user = result.scalars().one_or_none()
+    await db.commit()
+    return user
+
+
+async def update_password_hash(
+    db: AsyncSession, user_id: int, old_hash: str, new_hash: str
+) -> bool:
+    """
+    Replace a user's password hash, unless it changed since ``old_hash`` was read.
+
+    Used to upgrade hashes to the current hashing policy on login, without overwriting
+    a password changed concurrently.
+    """
+    result = await db.exec(
+        update(User)
+        .where(User.id == user_id, User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def enqueue_registration_jobs(user_id: int):
+    """
+    Enqueue the side effects of a registration (welcome email, audit event).
+
+    The user is already committed, so a queue outage is logged rather than failing the
+    registration.
+    """
+    try:
+        await enqueue(send_welcome_email, user_id)
+        await enqueue(record_audit_event, "user.registered", user_id=user_id)
+    except Exception:
+        logger.exception("Could not enqueue the registration jobs of user %s.", user_id)
+
+
+def unique_ids(ids: Sequence[int]) -> List[int]:
+    """Drop duplicate ids, keeping the order of first occurrence."""
+    return list(dict.fromkeys(ids))
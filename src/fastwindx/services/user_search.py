@@ -0,0 +1,309 @@
+"""
+User search for admin autocomplete: prefix and fuzzy matching over the username, email
+and name fields.
+
+On Postgres the matching runs in the database, backed by the trigram and prefix
+indexes of the user table. Other databases (SQLite) use ``UserSearchIndex``, an
+in-process index of the same fields that is built on first use and rebuilt after
+writes.
+
+Results of recent queries are cached for a few seconds, so the burst of requests an
+autocomplete box sends while someone types (and backspaces) is mostly served from
+memory.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import re
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, literal, or_
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+from ..core.config import settings
+from ..db.base import get_session
+from ..db.models.user import SEARCH_COLUMNS, User
+from ..utils.singleflight import singleflight
+from .user import get_users_by_ids
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_LENGTH = 100
+# Trigram matching needs at least this many characters to mean anything.
+MIN_FUZZY_LENGTH = 3
+
+
+def normalize_query(q: str) -> str:
+    """Lower-case the query and collapse whitespace."""
+    return " ".join(q.lower().split())[:MAX_QUERY_LENGTH]
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    The trigrams of ``text``, computed like ``pg_trgm`` does: every word is padded with
+    two spaces in front and one behind.
+    """
+    found = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        found.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return found
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class UserSearchIndex:
+    """
+    In-process prefix and trigram index over the searchable user fields.
+
+    Users are found by prefix of their username, email, the local part of their email,
+    their full name and each of its words. Fuzzy lookups compare the query's trigrams
+    with those of the words (username, email local part, names).
+    """
+
+    def __init__(self, rows=()):
+        self._users: Dict[str, List[int]] = defaultdict(list)
+        words: Set[str] = set()
+        for user_id, username, email, first_name, last_name in rows:
+            full_name = normalize_query(f"{first_name} {last_name}")
+            local_part = email.lower().split("@")[0]
+            user_words = {username.lower(), local_part, *full_name.split()}
+            words.update(user_words)
+            for token in user_words | {email.lower(), full_name}:
+                if token:
+                    self._users[token].append(user_id)
+        self._sorted = sorted(self._users)
+        self._postings: Dict[str, List[str]] = defaultdict(list)
+        for word in words:
+            for trigram in trigrams(word):
+                self._postings[trigram].append(word)
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def search(self, q: str, limit: int) -> List[int]:
+        """
+        Return the ids of up to ``limit`` users matching ``q``: prefix matches first (in
+        token order), then fuzzy matches by decreasing similarity.
+        """
+        found: Dict[int, None] = {}
+        position = bisect.bisect_left(self._sorted, q)
+        while position < len(self._sorted) and len(found) < limit:
+            token = self._sorted[position]
+            if not token.startswith(q):
+                break
+            found.update(dict.fromkeys(self._users[token][: limit - len(found)]))
+            position += 1
+
+        if len(found) < limit and len(q) >= MIN_FUZZY_LENGTH:
+            for _, word in self._fuzzy_matches(q):
+                found.update(dict.fromkeys(self._users[word][: limit - len(found)]))
+                if len(found) >= limit:
+                    break
+        return list(found)[:limit]
+
+    def _fuzzy_matches(self, q: str) -> List[Tuple[float, str]]:
+        """Words similar to ``q``, most similar first."""
+        query_trigrams = trigrams(q)
+        threshold = settings.SEARCH_SIMILARITY_THRESHOLD
+        # A word sharing fewer than ``threshold * len(query_trigrams)`` trigrams can't be
+        # similar enough, so it must contain one of the rarest trigrams beyond that
+        # number: only those postings are scanned for candidates.
+        required = max(1, math.ceil(threshold * len(query_trigrams)))
+        rarest = sorted(query_trigrams, key=lambda trigram: len(self._postings.get(trigram, ())))
+        candidates = set()
+        for trigram in rarest[: len(rarest) - required + 1]:
+            candidates.update(self._postings.get(trigram, ()))
+
+        scored = []
+        for word in candidates:
+            word_trigrams = trigrams(word)
+            shared = len(query_trigrams & word_trigrams)
+            score = shared / (len(query_trigrams) + len(word_trigrams) - shared)
+            if score >= threshold:
+                scored.append((-score, word))
+        scored.sort()
+        return scored
+
+
+class SearchCache:
+    """
+    LRU cache of recent search results with a short TTL.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[List[User], float]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[List[User]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, users: List[User]):
+        self._entries[key] = (users, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+search_cache = SearchCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL_SECONDS)
+_index: Optional[UserSearchIndex] = None
+# Bumped by every invalidation, so results computed from older data aren't stored.
+_generation = 0
+
+
+def invalidate():
+    """Forget the in-process index and cached results, e.g. after users changed."""
+    global _index, _generation
+    _index = None
+    _generation += 1
+    search_cache.clear()
+
+
+@singleflight(name="users.search_index")
+async def _build_index() -> UserSearchIndex:
+    global _index
+    generation = _generation
+    columns = [User.id, *(getattr(User, name) for name in SEARCH_COLUMNS)]
+    async with get_session() as session:
+        rows = (await session.exec(select(*columns))).all()
+    # Building takes a while on large tables; keep the event loop responsive meanwhile.
+    index = await asyncio.get_running_loop().run_in_executor(None, UserSearchIndex, rows)
+    if generation == _generation:
+        _index = index
+    logger.debug("Built the user search index: %d tokens for %d users.", len(index), len(rows))
+    return index
+
+
+async def _get_index() -> UserSearchIndex:
+    index = _index
+    if index is None or time.monotonic() - index.built_at > settings.SEARCH_INDEX_TTL_SECONDS:
+        index = await _build_index()
+    return index
+
+
+def _postgres_statement(q: str, limit: int):
+    columns = [getattr(User, name) for name in SEARCH_COLUMNS]
+    pattern = f"{_escape_like(q)}%"
+    if len(q) < MIN_FUZZY_LENGTH:
+        # Too short for the trigram indexes: match username and email prefixes only.
+        prefix = or_(
+            func.lower(User.username).like(pattern, escape="\\"),
+            func.lower(User.email).like(pattern, escape="\\"),
+        )
+        return select(User).where(prefix).order_by(func.lower(User.username), User.id).limit(limit)
+
+    prefix = or_(*(column.ilike(pattern, escape="\\") for column in columns))
+    fuzzy = or_(*(literal(q).op("<%")(column) for column in columns))
+    score = func.greatest(*(func.word_similarity(q, column) for column in columns))
+    return (
+        select(User)
+        .where(or_(prefix, fuzzy))
+        .order_by(case((prefix, 0), else_=1), score.desc(), User.id)
+        .limit(limit)
+    )
+
+
+@singleflight(name="users.search")
+async def _search(q: str, limit: int) -> List[User]:
+    async with get_session() as session:
+        if session.bind.dialect.name == "postgresql":
+            return list((await session.exec(_postgres_statement(q, limit))).all())
+        ids = (await _get_index()).search(q, limit)
+        if not ids:
+            return []
+        users = await get_users_by_ids(session, ids)
+        return [users[user_id] for user_id in ids if user_id in users]
+
+
+async def search_users(q: str, limit: int = 10) -> Tuple[List[User], bool]:
+    """
+    Search users by prefix or fuzzy match of their username, email or name.
+
+    Returns the matching users, best matches first, and whether they came from the
+    cache. The users are shared between callers; treat them as read-only.
+    """
+    q = normalize_query(q)
+    if not q:
+        return [], False
+
+    key = (q, limit)
+    users = search_cache.get(key)
+    if users is not None:
+        return users, True
+
+    generation = _generation
+    started = time.perf_counter()
+    users = await _search(q, limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > settings.SEARCH_LATENCY_BUDGET_MS:
+        logger.warning(
+            "User search took %.1fms (budget %.1fms) for a %d character query.",
+            elapsed_ms,
+            settings.SEARCH_LATENCY_BUDGET_MS,
+            len(q),
+        )
+    if generation == _generation:
+        search_cache.set(key, users)
+    return users, False
+
+
+def server_timing(started: float, cached: bool) -> str:
+    """A ``Server-Timing`` header value for a search started at ``started``."""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return f'search;dur={elapsed_ms:.2f};desc="{"cache" if cached else "query"}"'
+
+
+_DIRTY_KEY = "user_search_dirty"
+
+
+def _flushed(session, flush_context):
+    if any(
+        isinstance(instance, User) for instance in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_DIRTY_KEY] = True
+
+
+def _bulk_statement(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and (
+        orm_execute_state.bind_mapper is not None and orm_execute_state.bind_mapper.class_ is User
+    ):
+        orm_execute_state.session.info[_DIRTY_KEY] = True
+
+
+def _committed(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        invalidate()
+
+
+def _rolled_back(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+# Writes in this process drop the index and the cached results, whether they go through
+# the unit of work or bulk UPDATE/DELETE statements. Only once they are committed: a
+# search running in between would otherwise rebuild the index from the old rows and
+# keep it until SEARCH_INDEX_TTL_SECONDS. Writes by other processes show up once the
+# TTLs expire.
+event.listen(Session, "after_flush", _flushed)
+event.listen(Session, "do_orm_execute", _bulk_statement)
+event.listen(Session, "after_commit", _committed)
+event.listen(Session, "after_rollback", _rolled_back)
@@ -0,0 +1,170 @@
+"""
+Shared test fixtures.
+
+The schema is created once per test session. Every test then runs inside a transaction
+on a single connection that is rolled back afterwards; the application's sessions join
+it through SAVEPOINTs, so their commits never reach the database and tests don't need
+any cleanup.
+
+By default tests run against a throw-away SQLite database. Set ``TEST_DATABASE_URL`` to
+run them against Postgres instead. With pytest-xdist (``pytest -n auto``) every worker
+gets its own database.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from fastwindx.core.config import settings
+
+# Point the app at the test database before anything creates the engines. Importing
+# this module has already loaded the settings (through the fastwindx package), so they
+# are overridden in place.
+_worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+_test_database_url = os.environ.get("TEST_DATABASE_URL")
+if _test_database_url:
+    settings.SQLALCHEMY_DATABASE_URI = f"{_test_database_url}_{_worker}"
+else:
+    _sqlite_path = Path(tempfile.gettempdir()) / f"fastwindx_test_{_worker}.db"
+    _sqlite_path.unlink(missing_ok=True)
+    settings.SQLALCHEMY_DATABASE_URI = f"sqlite+aiosqlite:///{_sqlite_path}"
+settings.JOB_BACKEND = "memory"
+settings.LOG_JSON = False
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from fastwindx.core import security  # noqa: E402
+from fastwindx.core.hashing import create_password_context  # noqa: E402
+from fastwindx.core.security import create_access_token  # noqa: E402
+from fastwindx.db.base import async_engine, async_session, create_db_if_not_exists  # noqa: E402
+from fastwindx.db.models.user import User  # noqa: E402
+from fastwindx.jobs import JobQueue, set_queue  # noqa: E402
+from fastwindx.jobs.backends import InMemoryBackend  # noqa: E402
+from fastwindx.main import app  # noqa: E402
+from fastwindx.services import user_search  # noqa: E402
+from fastwindx.utils.pagination import count_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hashing():
+    """
+    Hash passwords with the minimum bcrypt cost; the default makes every hash ~250ms.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "PASSWORD_HASH_SCHEME", "bcrypt")
+        mp.setattr(settings, "PASSWORD_BCRYPT_ROUNDS", 4)
+        mp.setattr(security, "pwd_context", create_password_context(settings))
+        yield
+
+
+@pytest.fixture(scope="session")
+async def engine(anyio_backend):
+    """
+    The application engine, with the schema created once for the whole session.
+    """
+    create_db_if_not_exists()
+    async with async_engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.drop_all)
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield async_engine
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def connection(engine):
+    """
+    A connection with an open transaction that is rolled back after the test.
+
+    All sessions created by the app during the test are bound to it.
+    """
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        async_session.configure(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield connection
+        finally:
+            async_session.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+            await transaction.rollback()
+
+
+@pytest.fixture
+async def db(connection):
+    """A session for arranging and checking test data."""
+    async with async_session() as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Don't let cached results leak from one test's (rolled back) data into the next."""
+    count_cache.invalidate()
+    user_search.invalidate()
+    yield
+
+
+@pytest.fixture
+def job_backend():
+    """A fresh in-memory job backend; inspect it to assert on enqueued jobs."""
+    backend = InMemoryBackend()
+    set_queue(JobQueue(backend))
+    yield backend
+    set_queue(None)
+
+
+@pytest.fixture
+async def client(connection, job_backend):
+    """An HTTPX client calling the app in-process."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def create_user(db):
+    """
+    Factory creating users, e.g. ``await create_user(role="admin")``.
+    """
+    counter = 0
+
+    async def factory(password: str = "password", **fields) -> User:
+        nonlocal counter
+        counter += 1
+        user = User(
+            **{
+                "email": f"user{counter}@example.com",
+                "username": f"user{counter}",
+                "first_name": "Test",
+                "last_name": f"User {counter}",
+                "role": "user",
+                "phone_number": "",
+                "hashed_password": security.get_password_hash(password),
+                **fields,
+            }
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+    return factory
+
+
+@pytest.fixture
+def auth_headers():
+    """
+    Build Authorization headers for a user, e.g. ``auth_headers(admin)``.
+    """
+
+    def build(user: User) -> dict:
+        token = create_access_token(data={"sub": user.email, "id": user.id, "role": user.role})
+        return {"Authorization": f"Bearer {token}"}
+
+    return build
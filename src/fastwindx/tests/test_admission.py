@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from fastwindx.core import admission
+from fastwindx.core.admission import AdmissionControlMiddleware, DecayingAverage, LoadMonitor
+from fastwindx.core.config import settings
+from fastwindx.core.health import HealthMonitor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def client_for(monitor: LoadMonitor) -> httpx.AsyncClient:
+    app = AdmissionControlMiddleware(ok_app, monitor=monitor)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_decaying_average(clock):
+    average = DecayingAverage(half_life=5.0)
+    average.add(100)
+    assert average.value == pytest.approx(20)
+
+    clock[0] += 5
+    assert average.value == pytest.approx(10)
+    average.add(0)
+    assert average.value == pytest.approx(8)
+
+
+async def test_sheds_load_with_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 1)
+    monitor = LoadMonitor()
+
+    async with client_for(monitor) as client:
+        assert (await client.get("/api")).status_code == 200
+
+        monitor.in_flight = 1
+        response = await client.get("/api")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert response.json()["reason"] == "too many requests in flight"
+
+        # Health probes are always served.
+        assert (await client.get("/health/ready")).status_code == 200
+
+    assert monitor.rejected == 1
+
+
+async def test_shed_requests_are_not_logged_one_by_one(monkeypatch, caplog, clock):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 0)
+
+    with caplog.at_level(logging.WARNING, logger=admission.__name__):
+        async with client_for(LoadMonitor()) as client:
+            for _ in range(5):
+                await client.get("/api")
+            clock[0] += admission.SHED_LOG_INTERVAL_SECONDS
+            await client.get("/api")
+
+    warnings = [r.getMessage() for r in caplog.records]
+    assert len(warnings) == 2
+    assert "5 requests rejected" in warnings[1]
+
+
+async def test_health_monitor_caches_probe_results():
+    calls = 0
+
+    async def healthy():
+        nonlocal calls
+        calls += 1
+
+    async def failing():
+        raise ConnectionError("down")
+
+    async def hanging():
+        await asyncio.sleep(1)
+
+    monitor = HealthMonitor(interval=60, timeout=0.01)
+    monitor.add("database", healthy)
+    assert not monitor.healthy  # Not checked yet.
+
+    await monitor.refresh()
+    assert monitor.healthy
+    assert monitor.snapshot()["database"]["latency_ms"] is not None
+    assert calls == 1  # Reading the results doesn't run the checks.
+
+    monitor.add("redis", failing)
+    monitor.add("slow", hanging)
+    await monitor.refresh()
+    snapshot = monitor.snapshot()
+    assert not monitor.healthy
+    assert "down" in snapshot["redis"]["error"]
+    assert "TimeoutError" in snapshot["slow"]["error"]
+
+
+async def test_shed_responses_carry_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 0)
+
+    response = await client.get("/api/v1/users/", headers={"Origin": "http://localhost"})
+
+    assert response.status_code == 503
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost"
+    exposed = response.headers["Access-Control-Expose-Headers"].split(", ")
+    assert {"Retry-After", "X-Request-ID"} <= set(exposed)
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    text,
+)
+
+from fastwindx.db.advisor import IndexAdvisor, Predicate, parse_predicates
+
+metadata = MetaData()
+account = Table(
+    "account",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("email", String, index=True),
+    Column("name", String),
+    Column("is_active", Boolean),
+    Column("bio", String),
+)
+Index("ix_account_bio_trgm", account.c.bio, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
+def test_parse_predicates():
+    statement = (
+        'SELECT * FROM account WHERE lower(account.email) = ? AND "account".name IN (...) '
+        "AND account.is_active IS NOT 1 ORDER BY account.id LIMIT ?"
+    )
+
+    assert parse_predicates(statement) == [
+        Predicate("account", "email", "=", func="lower"),
+        Predicate("account", "name", "IN"),
+        Predicate("account", "is_active", "IS NOT", value="1"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "flag, where",
+    [
+        ("account.is_active = true", "is_active"),
+        ("account.is_active = false", "NOT is_active"),
+        ("account.is_active IS 0", "NOT is_active"),
+        ("account.is_active <> true", "NOT is_active"),
+        # The value of a bound parameter is unknown: no partial index.
+        ("account.is_active = ?", None),
+    ],
+)
+def test_propose_partial_index(flag, where):
+    advisor = IndexAdvisor(metadata)
+    advisor.record(f"SELECT * FROM account WHERE account.name = ? AND {flag}", 5.0)
+
+    (proposal,) = advisor.propose()
+
+    assert (proposal.expressions, proposal.where) == (["name"], where)
+    if where:
+        assert proposal.sql.endswith(f"(name) WHERE {where}")
+
+
+def test_propose_skips_indexed_columns():
+    advisor = IndexAdvisor(metadata)
+    advisor.record("SELECT * FROM account WHERE account.email = ?", 5.0)
+    advisor.record("SELECT * FROM account WHERE account.id = ?", 5.0)
+
+    assert advisor.propose() == []
+
+
+def test_propose_ignores_indexes_of_other_dialects():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    advisor = IndexAdvisor(metadata)
+    advisor.record("SELECT * FROM account WHERE account.bio = ?", 5.0)
+
+    (proposal,) = advisor.propose(engine)
+    assert proposal.expressions == ["bio"]
+    assert advisor.propose(dialect="postgresql") == []
+
+
+def test_failing_statements_are_not_recorded():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    advisor = IndexAdvisor(metadata)
+    advisor.install(engine)
+
+    with engine.connect() as connection:
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing WHERE missing.id = 1"))
+        connection.execute(text("SELECT * FROM account WHERE account.name = 'a'"))
+
+    assert list(advisor.patterns) == ["SELECT * FROM account WHERE account.name = 'a'"]
+    assert advisor.patterns["SELECT * FROM account WHERE account.name = 'a'"].count == 1
@@ -0,0 +1,71 @@
+import json
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from fastwindx.core import profiling
+from fastwindx.core.profiling import ProfilingMiddleware, profile_store
+from fastwindx.core.security import create_access_token
+from fastwindx.db.base import async_engine
+from fastwindx.main import app
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+
+
+@pytest.fixture
+async def profiling_client(connection, job_backend, tmp_path, monkeypatch):
+    """A client for the app wrapped in the profiling middleware, storing to tmp_path."""
+    monkeypatch.setattr(profile_store, "directory", tmp_path)
+    profiling.install_sql_hooks(async_engine.sync_engine)
+    transport = httpx.ASGITransport(app=ProfilingMiddleware(app, sample_rate=0))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    engine = async_engine.sync_engine
+    event.remove(engine, "before_cursor_execute", profiling._before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", profiling._after_cursor_execute)
+
+
+async def test_profile_request(profiling_client, create_user, auth_headers, tmp_path):
+    admin = await create_user(role="admin")
+    headers = {**auth_headers(admin), "X-Profile": "1"}
+
+    response = await profiling_client.get(f"{API}/users/users", headers=headers)
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    speedscope = json.loads((tmp_path / f"{profile_id}.speedscope.json").read_text())
+    assert [p["type"] for p in speedscope["profiles"]] == ["sampled", "evented"]
+    assert speedscope["profiles"][1]["events"]
+
+    response = await profiling_client.get(f"{API}/profiles", headers=auth_headers(admin))
+    assert [p["id"] for p in response.json()] == [profile_id]
+
+    response = await profiling_client.get(
+        f"{API}/profiles/{profile_id}", headers=auth_headers(admin)
+    )
+    assert response.json()["sql_count"] == len(response.json()["sql"]) > 0
+
+
+async def test_profile_header_requires_admin(profiling_client, create_user, auth_headers):
+    user = await create_user()
+    # The token of a demoted admin still claims the admin role.
+    token = create_access_token(data={"sub": user.email, "id": user.id, "role": "admin"})
+
+    for headers in (auth_headers(user), {"Authorization": f"Bearer {token}"}):
+        response = await profiling_client.get(
+            f"{API}/users/me", headers={**headers, "X-Profile": "1"}
+        )
+
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+
+
+async def test_profiles_require_admin(client, create_user, auth_headers):
+    user = await create_user()
+
+    response = await client.get(f"{API}/profiles", headers=auth_headers(user))
+
+    assert response.status_code == 403
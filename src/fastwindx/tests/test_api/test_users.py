@@ -0,0 +1,329 @@
+import httpx
+import pytest
+from sqlalchemy import update
+
+from fastwindx.db.models.user import User
+from fastwindx.services import user_search
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1/users"
+
+NEW_USER = {
+    "username": "newuser",
+    "email": "new@example.com",
+    "first_name": "New",
+    "last_name": "User",
+    "password": "secret",
+    "role": "user",
+    "phone_number": "555-0100",
+}
+
+
+async def test_register_user(client, job_backend):
+    response = await client.post(f"{API}/register", json=NEW_USER)
+
+    assert response.status_code == 201
+    assert response.json()["token_type"] == "bearer"
+    assert len(job_backend) == 2
+
+
+async def test_register_user_survives_queue_outage(client, job_backend, monkeypatch):
+    async def push(job):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(job_backend, "push", push)
+
+    response = await client.post(f"{API}/register", json=NEW_USER)
+
+    assert response.status_code == 201
+
+
+async def test_register_duplicate_email(client, create_user):
+    await create_user(email=NEW_USER["email"])
+
+    response = await client.post(f"{API}/register", json=NEW_USER)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+async def test_login_for_access_token(client, create_user):
+    user = await create_user(password="secret")
+
+    response = await client.post(
+        f"{API}/token", data={"username": user.email, "password": "secret"}
+    )
+    assert response.status_code == 200
+
+    response = await client.post(f"{API}/token", data={"username": user.email, "password": "wrong"})
+    assert response.status_code == 401
+
+
+async def test_read_users_me(client, create_user, auth_headers):
+    user = await create_user()
+
+    response = await client.get(f"{API}/me", headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json()["email"] == user.email
+
+
+async def test_read_users_me_requires_token(client):
+    response = await client.get(f"{API}/me")
+
+    assert response.status_code == 401
+
+
+async def test_update_user_me(client, create_user, auth_headers):
+    user = await create_user()
+
+    response = await client.put(
+        f"{API}/me", json={**NEW_USER, "first_name": "Changed"}, headers=auth_headers(user)
+    )
+
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Changed"
+
+
+async def test_read_users_requires_admin(client, create_user, auth_headers):
+    user = await create_user()
+
+    response = await client.get(f"{API}/users", headers=auth_headers(user))
+
+    assert response.status_code == 403
+
+
+async def test_read_users(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    await create_user()
+
+    response = await client.get(f"{API}/users", headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "2"
+
+
+async def test_read_users_pagination_headers(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    for _ in range(4):
+        await create_user()
+
+    response = await client.get(
+        f"{API}/users",
+        params={"skip": 2, "limit": 2, "count": "exact"},
+        headers=auth_headers(admin),
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Total-Count-Exact"] == "true"
+    prev_url = httpx.URL(response.links["prev"]["url"])
+    next_url = httpx.URL(response.links["next"]["url"])
+    assert (prev_url.params["skip"], prev_url.params["count"]) == ("0", "exact")
+    assert (next_url.params["skip"], next_url.params["count"]) == ("4", "exact")
+
+    response = await client.get(
+        f"{API}/users", params={"skip": 4, "limit": 2, "count": "none"}, headers=auth_headers(admin)
+    )
+
+    assert "X-Total-Count" not in response.headers
+    assert "next" not in response.links
+
+
+async def test_read_users_limit_is_capped(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+
+    response = await client.get(
+        f"{API}/users", params={"limit": 100_000}, headers=auth_headers(admin)
+    )
+
+    assert response.status_code == 422
+
+
+async def test_read_user_of_someone_else(client, create_user, auth_headers):
+    user = await create_user()
+    other = await create_user()
+
+    response = await client.get(f"{API}/users/{other.id}", headers=auth_headers(user))
+
+    assert response.status_code == 403
+
+
+async def test_delete_user(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    user = await create_user()
+
+    response = await client.delete(f"{API}/users/{user.id}", headers=auth_headers(admin))
+    assert response.status_code == 204
+
+    response = await client.get(f"{API}/users/{user.id}", headers=auth_headers(admin))
+    assert response.status_code == 404
+
+
+async def test_read_users_batch(client, create_user, auth_headers):
+    user = await create_user()
+    other = await create_user()
+
+    response = await client.get(
+        f"{API}/users/batch",
+        params={"ids": [user.id, other.id, 999_999]},
+        headers=auth_headers(user),
+    )
+
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == ["ok", "forbidden", "not_found"]
+
+
+async def test_deactivate_and_delete_users_batch(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    users = [await create_user() for _ in range(3)]
+    ids = [u.id for u in users]
+
+    response = await client.post(
+        f"{API}/users/batch/deactivate", json={"ids": ids}, headers=auth_headers(admin)
+    )
+    assert [r["status"] for r in response.json()] == ["ok"] * 3
+
+    response = await client.get(f"{API}/users/{ids[0]}", headers=auth_headers(admin))
+    assert response.json()["is_active"] is False
+
+    response = await client.post(
+        f"{API}/users/batch/delete", json={"ids": ids + [999_999]}, headers=auth_headers(admin)
+    )
+    assert [r["status"] for r in response.json()] == ["ok"] * 3 + ["not_found"]
+
+
+async def test_search_users(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    alice = await create_user(username="alice", first_name="Alice", last_name="Johnson")
+    await create_user(username="bob", first_name="Bob", last_name="Jones")
+
+    response = await client.get(f"{API}/search", params={"q": "ali"}, headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()] == [alice.id]
+    assert "Server-Timing" in response.headers
+
+    response = await client.get(f"{API}/search", params={"q": "jo"}, headers=auth_headers(admin))
+    assert {u["username"] for u in response.json()} == {"alice", "bob"}
+
+    # Fuzzy: a typo still finds the user.
+    response = await client.get(
+        f"{API}/search", params={"q": "johnsen"}, headers=auth_headers(admin)
+    )
+    assert [u["id"] for u in response.json()] == [alice.id]
+
+
+async def test_search_users_sees_new_users(client, create_user, auth_headers):
+    admin = await create_user(role="admin")
+    params = {"q": "carol"}
+
+    response = await client.get(f"{API}/search", params=params, headers=auth_headers(admin))
+    assert response.json() == []
+
+    await create_user(username="carol")
+
+    response = await client.get(f"{API}/search", params=params, headers=auth_headers(admin))
+    assert [u["username"] for u in response.json()] == ["carol"]
+
+
+async def test_search_index_is_invalidated_on_commit(db, create_user):
+    user = await create_user()
+    generation = user_search._generation
+
+    user.first_name = "Changed"
+    db.add(user)
+    await db.flush()
+    # A search between the flush and the commit would index the old rows.
+    assert user_search._generation == generation
+
+    await db.commit()
+    assert user_search._generation == generation + 1
+
+    await db.exec(update(User).where(User.id == user.id).values(first_name="Bulk"))
+    await db.rollback()
+    assert user_search._generation == generation + 1
+
+
+async def test_search_users_requires_admin(client, create_user, auth_headers):
+    user = await create_user()
+
+    response = await client.get(f"{API}/search", params={"q": "a"}, headers=auth_headers(user))
+
+    assert response.status_code == 403
+
+
+async def test_search_users_fragment(client, create_user, auth_headers):
+    admin = await create_user(role="admin", first_name="Dana")
+    client.cookies.set("access_token", auth_headers(admin)["Authorization"])
+
+    response = await client.get("/users/search", params={"q": "dana"})
+
+    assert response.status_code == 200
+    assert "text/html" in response.headers["content-type"]
+    assert admin.email in response.text
+
+
+async def test_login_upgrades_outdated_password_hash(client, db, create_user):
+    from passlib.context import CryptContext
+
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+    user = await create_user(hashed_password=outdated)
+
+    response = await client.post(
+        f"{API}/token", data={"username": user.email, "password": "secret"}
+    )
+
+    assert response.status_code == 200
+    await db.refresh(user)
+    assert user.hashed_password != outdated
+    assert user.hashed_password.startswith("$2b$04$")
+
+
+async def test_read_users_me_not_modified(client, create_user, auth_headers):
+    user = await create_user()
+    headers = auth_headers(user)
+
+    response = await client.get(f"{API}/me", headers=headers)
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    response = await client.get(f"{API}/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = await client.get(
+        f"{API}/users/{user.id}",
+        headers={**headers, "If-Modified-Since": response.headers["Last-Modified"]},
+    )
+    assert response.status_code == 304
+
+
+async def test_update_user_me_if_match(client, create_user, auth_headers):
+    user = await create_user()
+    headers = auth_headers(user)
+    etag = (await client.get(f"{API}/me", headers=headers)).headers["ETag"]
+    update = {**NEW_USER, "email": user.email, "username": user.username}
+
+    response = await client.put(
+        f"{API}/me",
+        json={**update, "first_name": "First"},
+        headers={**headers, "If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == user.version + 1
+    assert response.headers["ETag"] != etag
+
+    # A second update based on the same, now stale, version is rejected.
+    response = await client.put(
+        f"{API}/me",
+        json={**update, "first_name": "Second"},
+        headers={**headers, "If-Match": etag},
+    )
+    assert response.status_code == 412
+
+    response = await client.get(f"{API}/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "First"
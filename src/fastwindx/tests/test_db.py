@@ -0,0 +1,136 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, select, text, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import fastwindx
+from fastwindx.db.base import (
+    BASELINE_REVISION,
+    RoutingSession,
+    async_engine,
+    async_write_engine,
+    get_alembic_config,
+    is_sqlite,
+    upgrade_db,
+)
+from fastwindx.db.models.user import User
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not is_sqlite, reason="SQLite backend only"),
+]
+
+
+async def test_sqlite_pragmas(connection):
+    journal_mode = (await connection.exec_driver_sql("PRAGMA journal_mode")).scalar()
+    synchronous = (await connection.exec_driver_sql("PRAGMA synchronous")).scalar()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+
+
+async def test_writes_are_routed_to_the_writer(engine):
+    session = AsyncSession(async_engine, sync_session_class=RoutingSession)
+    routing = session.sync_session
+
+    assert routing.get_bind(clause=select(User)) is async_engine.sync_engine
+    assert routing.get_bind(clause=update(User)) is async_write_engine.sync_engine
+    # The rest of a transaction that wrote stays on the writer.
+    assert routing.get_bind(clause=select(User)) is async_write_engine.sync_engine
+    await session.close()
+
+
+@pytest.mark.parametrize("version_table", ["dropped", "empty"])
+def test_upgrade_stamps_legacy_database(tmp_path, version_table):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        upgrade_db(BASELINE_REVISION, connection=connection)
+        # Built by create_all, or left behind by a migration that failed.
+        if version_table == "dropped":
+            connection.execute(text("DROP TABLE alembic_version"))
+        else:
+            connection.execute(text("DELETE FROM alembic_version"))
+
+    with engine.begin() as connection:
+        upgrade_db(connection=connection)
+        columns = {c["name"] for c in inspect(connection).get_columns("user")}
+        revision = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+    assert "version" in columns
+    assert revision == ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+    engine.dispose()
+
+
+def test_autogenerate_finds_no_changes_after_upgrade(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        upgrade_db(connection=connection)
+        config.attributes["connection"] = connection
+        # Raises if the models and the migrated schema differ, e.g. because the
+        # Postgres-only search indexes are proposed on SQLite.
+        command.check(config)
+    engine.dispose()
+
+
+def test_in_memory_database():
+    # The engines are built from the settings at import time: use a fresh interpreter.
+    script = """
+import asyncio
+
+import httpx
+
+from fastwindx.db.base import async_engine, async_write_engine, close_db, init_db
+from fastwindx.main import app
+
+assert async_write_engine is async_engine
+
+
+async def main():
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        user = {
+            "username": "memory",
+            "email": "memory@example.com",
+            "first_name": "In",
+            "last_name": "Memory",
+            "password": "secret",
+            "role": "user",
+            "phone_number": "",
+        }
+        response = await client.post("/api/v1/users/register", json=user)
+        assert response.status_code == 201, response.text
+        token = response.json()["access_token"]
+        response = await client.get(
+            "/api/v1/users/me", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.json()["username"] == "memory", response.text
+    await close_db()
+
+
+asyncio.run(main())
+"""
+    env = {
+        **{k: v for k, v in os.environ.items() if k != "SQLALCHEMY_DATABASE_URI"},
+        "DATABASE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+        "JOB_BACKEND": "memory",
+        "SECRET_KEY": "test-secret-key",
+        "PASSWORD_BCRYPT_ROUNDS": "4",
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        cwd=Path(fastwindx.__file__).parent.parent,
+        capture_output=True,
+        text=True,
+    )
+
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+from fastwindx.jobs import Job, JobQueue, Worker, job
+from fastwindx.jobs.backends import InMemoryBackend, RedisBackend
+
+pytestmark = pytest.mark.anyio
+
+calls = []
+
+
+@job(name="tests.record", max_retries=0)
+async def record(value):
+    calls.append(value)
+
+
+@job(name="tests.flaky", max_retries=2, retry_backoff=0.01)
+async def flaky():
+    calls.append("flaky")
+    raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.fixture
+async def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisBackend(fakeredis.aioredis.FakeRedis(), visibility_timeout=60)
+    yield backend
+    await backend.close()
+
+
+async def test_redis_enqueue_reserve_ack(redis_backend):
+    queue = JobQueue(redis_backend)
+    queued = await queue.enqueue(record, 1)
+    await queue.enqueue(record, 2, _delay=60)
+
+    reserved = await redis_backend.reserve(10)
+    assert [j.id for j in reserved] == [queued.id]
+    assert reserved[0].args == [1]
+    assert await redis_backend.reserve(10) == []
+
+    await redis_backend.ack(reserved[0])
+    assert not await redis_backend.client.hexists(redis_backend.jobs_key, queued.id)
+    assert await redis_backend.client.zcard(redis_backend.processing_key) == 0
+
+
+async def test_redis_retry_and_fail(redis_backend):
+    queued = await JobQueue(redis_backend).enqueue(record, 1)
+    (reserved,) = await redis_backend.reserve(1)
+
+    reserved.attempts, reserved.run_at = 1, time.time() - 1
+    await redis_backend.retry(reserved)
+    (retried,) = await redis_backend.reserve(1)
+    assert (retried.id, retried.attempts) == (queued.id, 1)
+
+    await redis_backend.fail(retried)
+    (dead,) = await redis_backend.client.lrange(redis_backend.dead_key, 0, -1)
+    assert Job.from_json(dead).id == queued.id
+    assert await redis_backend.reserve(1) == []
+
+
+async def test_redis_requeues_expired_leases(redis_backend):
+    queued = await JobQueue(redis_backend).enqueue(record, 1)
+    redis_backend.visibility_timeout = 0
+    await redis_backend.reserve(1)
+
+    # The worker holding the job "crashed": the lease expires and the job runs again.
+    redis_backend.visibility_timeout = 60
+    assert [j.id for j in await redis_backend.reserve(1)] == [queued.id]
+
+
+async def test_worker_retries_with_backoff_then_fails():
+    backend = InMemoryBackend()
+    queue = JobQueue(backend)
+    await queue.enqueue(flaky)
+    worker = Worker(queue, concurrency=1, poll_interval=0.01)
+    worker.start()
+
+    for _ in range(100):
+        if backend.dead:
+            break
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert calls == ["flaky"] * 3
+    (dead,) = backend.dead
+    assert dead.attempts == 3
+    assert "boom" in dead.last_error
+
+
+async def test_worker_concurrency_limit():
+    running = peak = 0
+    release = asyncio.Event()
+
+    @job(name="tests.blocking", max_retries=0)
+    async def blocking():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        running -= 1
+
+    backend = InMemoryBackend()
+    queue = JobQueue(backend)
+    for _ in range(5):
+        await queue.enqueue(blocking)
+    worker = Worker(queue, concurrency=2, poll_interval=0.01)
+    worker.start()
+
+    await asyncio.sleep(0.05)
+    assert (running, len(backend)) == (2, 5)
+    release.set()
+    for _ in range(100):
+        if not len(backend):
+            break
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert peak == 2
+    assert len(backend) == 0
+
+
+async def test_worker_stop_cancels_jobs_after_timeout():
+    cancelled = asyncio.Event()
+
+    @job(name="tests.endless", max_retries=0)
+    async def endless():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    queue = JobQueue(InMemoryBackend())
+    await queue.enqueue(endless)
+    worker = Worker(queue, concurrency=1, poll_interval=0.01)
+    task = worker.start()
+    await asyncio.sleep(0.05)
+
+    # The worker is at full concurrency: the loop is waiting for the job to finish.
+    started = time.monotonic()
+    await worker.stop(timeout=0.1)
+
+    assert time.monotonic() - started < 1
+    assert task.done()
+    assert cancelled.is_set()
@@ -0,0 +1,97 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from fastwindx.core import logs
+from fastwindx.core.logs import (
+    RateLimitFilter,
+    RequestIdFilter,
+    SamplingFilter,
+    request_id_var,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.makeLogRecord({"name": name, "levelno": level, "msg": "message"})
+
+
+def test_sampling_filter():
+    sampling = SamplingFilter({"sqlalchemy": 0.0, "sqlalchemy.pool": 1.0})
+
+    assert not sampling.filter(record("sqlalchemy.engine"))
+    assert sampling.filter(record("sqlalchemy.engine", logging.WARNING))
+    # The most specific prefix wins; other loggers are not sampled at all.
+    assert sampling.filter(record("sqlalchemy.pool"))
+    assert sampling.filter(record("sqlalchemyx"))
+
+
+def test_rate_limit_filter(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(logs.time, "monotonic", lambda: now)
+    rate_limit = RateLimitFilter({"noisy": 2})
+
+    assert [rate_limit.filter(record("noisy")) for _ in range(4)] == [True, True, False, False]
+    assert rate_limit.filter(record("noisy", logging.ERROR))
+    assert rate_limit.filter(record("quiet"))
+
+    now += 1
+    passed = record("noisy")
+    assert rate_limit.filter(passed)
+    assert passed.dropped == 2
+
+
+def test_request_id_filter():
+    token = request_id_var.set("abc")
+    try:
+        tagged = record("app")
+        RequestIdFilter().filter(tagged)
+    finally:
+        request_id_var.reset(token)
+
+    assert tagged.request_id == "abc"
+
+
+def test_shutdown_logging_restores_handlers(capsys):
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    settings = SimpleNamespace(
+        LOG_JSON=False,
+        LOG_QUEUE_SIZE=100,
+        LOG_SAMPLING={},
+        LOG_RATE_LIMITS={},
+        LOG_LEVEL="INFO",
+        LOG_SQL=False,
+    )
+
+    setup_logging(settings)
+    logging.getLogger("fastwindx.tests").info("through the queue")
+    shutdown_logging()
+
+    assert "through the queue" in capsys.readouterr().err
+    assert (root.handlers, root.level) == (handlers, level)
+
+
+@pytest.mark.anyio
+async def test_request_id_propagates_to_jobs(client, job_backend):
+    user = {
+        "username": "traced",
+        "email": "traced@example.com",
+        "first_name": "Traced",
+        "last_name": "User",
+        "password": "secret",
+        "role": "user",
+        "phone_number": "",
+    }
+
+    response = await client.post(
+        "/api/v1/users/register", json=user, headers={"X-Request-ID": "req-1"}
+    )
+
+    assert response.headers["X-Request-ID"] == "req-1"
+    assert {job.request_id for _, _, job in job_backend._heap} == {"req-1"}
+
+    response = await client.get("/health")
+    assert len(response.headers["X-Request-ID"]) == 32
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from fastwindx.core.hashing import calibrate_bcrypt, create_password_context
+
+
+def policy(**overrides):
+    return SimpleNamespace(
+        **{
+            "PASSWORD_HASH_SCHEME": "bcrypt",
+            "PASSWORD_BCRYPT_ROUNDS": 4,
+            "PASSWORD_ARGON2_TIME_COST": 1,
+            "PASSWORD_ARGON2_MEMORY_COST_KB": 8 * 1024,
+            "PASSWORD_ARGON2_PARALLELISM": 1,
+            **overrides,
+        }
+    )
+
+
+def test_hashes_of_the_other_scheme_need_update():
+    pytest.importorskip("argon2")
+    bcrypt_hash = create_password_context(policy()).hash("secret")
+    context = create_password_context(policy(PASSWORD_HASH_SCHEME="argon2"))
+
+    valid, new_hash = context.verify_and_update("secret", bcrypt_hash)
+
+    assert valid
+    assert new_hash.startswith("$argon2id$")
+
+
+def test_unknown_scheme_is_rejected():
+    with pytest.raises(ValueError):
+        create_password_context(policy(PASSWORD_HASH_SCHEME="md5"))
+
+
+def test_calibrate_bcrypt_respects_the_target():
+    parameters, elapsed = calibrate_bcrypt(target_ms=0.001, repeat=1)
+
+    # Even the minimum cost is over such a target: the minimum is returned, measured.
+    assert parameters == {"PASSWORD_BCRYPT_ROUNDS": 4}
+    assert elapsed > 0.001
+
+    parameters, elapsed = calibrate_bcrypt(target_ms=50, repeat=1)
+
+    assert parameters["PASSWORD_BCRYPT_ROUNDS"] >= 4
+    assert elapsed <= 50
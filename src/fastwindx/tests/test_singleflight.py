@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from fastwindx.utils.singleflight import SingleFlight, singleflight, singleflight_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_calls_are_coalesced():
+    group = SingleFlight("test")
+    executions = 0
+
+    async def load(value):
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return [value]
+
+    results = await asyncio.gather(*(group.do("key", load, 1) for _ in range(5)))
+
+    assert executions == 1
+    assert all(result is results[0] for result in results)
+    assert group.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+    # Nothing is cached once the call finished.
+    await group.do("key", load, 1)
+    assert executions == 2
+
+
+async def test_exceptions_reach_every_caller():
+    group = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(group.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert group.stats()["executions"] == 1
+
+
+async def test_cancelled_caller_does_not_cancel_the_call():
+    group = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(group.do("key", load))
+    second = asyncio.ensure_future(group.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+
+
+async def test_decorator_keys_and_stats():
+    calls = []
+
+    @singleflight(key=lambda user_id, session: user_id, name="tests.load_user")
+    async def load_user(user_id, session):
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        return user_id
+
+    assert await asyncio.gather(load_user(1, "a"), load_user(1, "b"), load_user(2, "c")) == [
+        1,
+        1,
+        2,
+    ]
+    assert sorted(calls) == [1, 2]
+    assert singleflight_stats()["tests.load_user"]["coalesced"] == 1
+
+
+async def test_stats_in_readiness_probe(client):
+    response = await client.get("/health/ready")
+
+    assert "users.by_id" in response.json()["singleflight"]
@@ -0,0 +1,105 @@
+"""
+Conditional requests (RFC 9110) for versioned resources.
+
+A resource with a ``version`` that grows on every change gets a strong ``ETag`` of
+``"<id>-<version>"``. Reads answer ``If-None-Match`` (or ``If-Modified-Since``) with
+``304 Not Modified``, so clients can revalidate without transferring the body again.
+Writes use ``If-Match``: the versions it names go straight into the ``WHERE`` clause
+of the update, so the precondition is checked by the database, atomically, without
+reading the row first.
+"""
+
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+# Responses depend on the caller's token: private caches only, and revalidate each time.
+CACHE_CONTROL = "private, no-cache"
+
+_ETAG_RE = re.compile(r'(W/)?"([^"]*)"')
+
+
+def make_etag(resource_id: int, version: int) -> str:
+    return f'"{resource_id}-{version}"'
+
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc)
+
+
+def set_cache_headers(response: Response, resource_id: int, version: int, updated_at: datetime):
+    """
+    Add ``ETag``, ``Last-Modified`` and ``Cache-Control`` to a response.
+    """
+    response.headers["ETag"] = make_etag(resource_id, version)
+    response.headers["Last-Modified"] = format_datetime(_utc(updated_at), usegmt=True)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified(
+    request: Request, resource_id: int, version: int, updated_at: datetime
+) -> Optional[Response]:
+    """
+    A ``304 Not Modified`` response if the client's copy is current, else ``None``.
+
+    ``If-None-Match`` uses weak comparison and takes precedence over
+    ``If-Modified-Since``, which is only checked when there is no ``If-None-Match``.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        etag = make_etag(resource_id, version)
+        fresh = if_none_match.strip() == "*" or any(
+            f'"{tag}"' == etag for _, tag in _ETAG_RE.findall(if_none_match)
+        )
+    else:
+        fresh = _not_modified_since(request.headers.get("If-Modified-Since"), updated_at)
+    if not fresh:
+        return None
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, resource_id, version, updated_at)
+    return response
+
+
+def _not_modified_since(header: Optional[str], updated_at: datetime) -> bool:
+    if header is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # Last-Modified has a resolution of one second.
+    return _utc(updated_at).replace(microsecond=0) <= since
+
+
+def if_match_versions(request: Request, resource_id: int) -> Optional[List[int]]:
+    """
+    The versions of the resource named by ``If-Match``.
+
+    Returns ``None`` if there is no precondition (no header, or ``*`` for a resource
+    that exists) and raises ``412 Precondition Failed`` if no tag can match: strong
+    comparison never matches weak tags, nor the tags of other resources.
+    """
+    if_match = request.headers.get("If-Match")
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    prefix = f"{resource_id}-"
+    for weak, tag in _ETAG_RE.findall(if_match):
+        if not weak and tag.startswith(prefix) and tag[len(prefix) :].isdigit():
+            versions.append(int(tag[len(prefix) :]))
+    if not versions:
+        raise precondition_failed()
+    return versions
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="The resource was modified since it was read",
+    )
@@ -0,0 +1,121 @@
+"""
+Pagination metadata: total counts and navigation links for list endpoints.
+
+Counting every row of a large table is a full scan on Postgres, so totals come in three
+flavours selectable per request:
+
+- ``exact``: ``count(*)``, cached for ``PAGINATION_COUNT_CACHE_TTL_SECONDS``
+- ``estimate``: the planner's row estimate (``pg_class.reltuples``), which costs a
+  catalog lookup. Small tables, tables that were never analyzed and other databases
+  fall back to the cached exact count.
+- ``none``: no total at all
+"""
+
+import time
+from typing import Dict, Literal, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+
+CountMode = Literal["exact", "estimate", "none"]
+
+
+class CountCache:
+    """
+    Small TTL cache of row counts, keyed by table name.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, key: str) -> Optional[int]:
+        entry = self._counts.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, key: str, count: int, ttl: float):
+        self._counts[key] = (count, time.monotonic() + ttl)
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._counts.clear()
+        else:
+            self._counts.pop(key, None)
+
+
+count_cache = CountCache()
+
+
+async def exact_count(db: AsyncSession, model) -> int:
+    """``count(*)`` of the model's table, cached for a short while."""
+    table = model.__table__
+    count = count_cache.get(table.name)
+    if count is None:
+        count = (await db.exec(select(func.count()).select_from(table))).one()[0]
+        count_cache.set(table.name, count, settings.PAGINATION_COUNT_CACHE_TTL_SECONDS)
+    return count
+
+
+async def estimated_count(db: AsyncSession, model) -> Optional[int]:
+    """
+    The planner's estimate of the number of rows, or ``None`` if there is none.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+    table_name = db.bind.dialect.identifier_preparer.format_table(model.__table__)
+    result = await db.exec(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        params={"name": table_name},
+    )
+    estimate = result.scalar()
+    # reltuples is -1 (or 0 on older versions) until the table is vacuumed or analyzed.
+    if estimate is None or estimate < settings.PAGINATION_ESTIMATE_MIN_ROWS:
+        return None
+    return int(estimate)
+
+
+async def count_rows(db: AsyncSession, model, mode: CountMode) -> Tuple[Optional[int], bool]:
+    """
+    Count the rows of the model's table according to ``mode``.
+
+    Returns the total (``None`` for mode ``none``) and whether it is exact.
+    """
+    if mode == "none":
+        return None, False
+    if mode == "estimate":
+        estimate = await estimated_count(db, model)
+        if estimate is not None:
+            return estimate, False
+    return await exact_count(db, model), True
+
+
+def set_pagination_headers(
+    request: Request,
+    response: Response,
+    skip: int,
+    limit: int,
+    returned: int,
+    total: Optional[int],
+    exact: bool,
+):
+    """
+    Add ``X-Total-Count`` and a ``Link`` header with ``first``/``prev``/``next`` links.
+    """
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+
+    def page(page_skip: int):
+        return request.url.include_query_params(skip=page_skip, limit=limit)
+
+    has_next = returned >= limit and (not exact or total is None or skip + limit < total)
+    links = [(page(0), "first")]
+    if skip > 0:
+        links.append((page(max(0, skip - limit)), "prev"))
+    if has_next:
+        links.append((page(skip + limit), "next"))
+    response.headers["Link"] = ", ".join(f'<{url}>; rel="{rel}"' for url, rel in links)
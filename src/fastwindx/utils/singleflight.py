@@ -0,0 +1,112 @@
+"""
+Request coalescing ("single-flight") for concurrent identical lookups.
+
+While a call for a given key is in flight, further callers with the same key wait for
+its result instead of starting their own. Nothing is cached: once the call finishes the
+next caller starts a fresh one.
+"""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    A group of coalesced calls, with counters describing how much work was saved.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def coalesced(self) -> int:
+        """Number of calls that were served by another caller's in-flight call."""
+        return self.calls - self.executions
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """
+        Run ``func(*args, **kwargs)``, or wait for the in-flight call with the same key.
+
+        The call runs in its own task, so a caller being cancelled does not cancel the
+        call for the others that are waiting on it.
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away.
+            task.exception()
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_group(name: str) -> SingleFlight:
+    """Return the named single-flight group, creating it on first use."""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every single-flight group, keyed by group name."""
+    return {name: group.stats() for name, group in _groups.items()}
+
+
+def singleflight(
+    key: Optional[Callable[..., Hashable]] = None, name: Optional[str] = None
+) -> Callable:
+    """
+    Coalesce concurrent calls of an async function (a service method or dependency).
+
+    ``key`` receives the call's arguments and returns the key identifying identical
+    calls; by default all positional and keyword arguments are used. Arguments that
+    differ per request but don't affect the result (such as a DB session) must be left
+    out of the key. The decorated function keeps its signature, so it can be used as a
+    FastAPI dependency.
+
+    Concurrent callers share the same result object, so it should be treated as
+    read-only (e.g. ORM instances loaded in their own session and detached).
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        group = get_group(name or f"{func.__module__}.{func.__qualname__}")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if key is not None:
+                call_key = key(*args, **kwargs)
+            else:
+                call_key = (args, tuple(sorted(kwargs.items())))
+            try:
+                hash(call_key)
+            except TypeError:
+                return await func(*args, **kwargs)
+            return await group.do(call_key, func, *args, **kwargs)
+
+        wrapper.singleflight = group
+        return wrapper
+
+    return decorator
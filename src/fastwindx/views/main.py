@@ -1,22 +1,26 @@
 import logging
+import time
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
 
-from ..api.deps import get_db
+from ..api.deps import get_current_user_from_cookie, get_db
 from ..core.config import settings
 from ..core.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     get_password_hash,
-    verify_password,
+    verify_and_update_password,
 )
 from ..db.models.user import User
 from ..schemas.user import UserCreate
+from ..services import user as user_service
+from ..services import user_search
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -47,12 +51,19 @@ async def login(request: Request, db: AsyncSession = Depends(get_db)):
 
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.hashed_password):
+    valid, new_hash = False, None
+    if user and password:
+        valid, new_hash = await run_in_threadpool(
+            verify_and_update_password, password, user.hashed_password
+        )
+    if not valid:
         if request.headers.get("HX-Request") == "true":
             return HTMLResponse('<div class="alert alert-error">Incorrect email or password</div>')
         return templates.TemplateResponse(
             "auth/login.html", {"request": request, "msg": "Incorrect email or password"}
         )
+    if new_hash:
+        await user_service.update_password_hash(db, user.id, user.hashed_password, new_hash)
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -104,7 +115,7 @@ async def register(request: Request, db: AsyncSession = Depends(get_db)):
             status_code=400,
         )
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -118,6 +129,8 @@ async def register(request: Request, db: AsyncSession = Depends(get_db)):
     await db.commit()
     await db.refresh(db_user)
 
+    await user_service.enqueue_registration_jobs(db_user.id)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email, "id": db_user.id, "role": db_user.role},
@@ -138,3 +151,24 @@ async def logout(request: Request):
     )
     response.delete_cookie("access_token")
     return response
+
+
+@router.get("/users/search", response_class=HTMLResponse)
+async def search_users_fragment(
+    request: Request,
+    q: str = Query("", max_length=user_search.MAX_QUERY_LENGTH),
+    limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_RESULTS),
+    current_user: User = Depends(get_current_user_from_cookie),
+):
+    """
+    Search results as an HTML fragment, for the ``components/user_search.html`` input.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    started = time.perf_counter()
+    users, cached = await user_search.search_users(q, limit)
+    response = templates.TemplateResponse(
+        request, "components/user_search_results.html", {"users": users, "q": q}
+    )
+    response.headers["Server-Timing"] = user_search.server_timing(started, cached)
+    return response